@@ -0,0 +1,110 @@
+import pygame
+import math
+
+
+class AssetManager:
+    # each sprite sheet is loaded, sliced and converted once, every sprite shares the same frame lists
+    def __init__(self):
+        self.sheets = {}
+        self.frames = {}
+        self.facing_frames = {}  # name -> {facing_right: [(image, mask), ...]}
+        self.rotated_projectiles = {}  # (projectile_type, state, index, angle bucket) -> (image, mask)
+        self.angle_step = 5  # degrees
+
+    def load_sheet(self, path):
+        if path not in self.sheets:
+            self.sheets[path] = pygame.image.load(path).convert_alpha()
+        return self.sheets[path]
+
+    def preload(self):
+        # needs a display mode set for convert_alpha
+        self.get_projectile_sprites()
+        for name in ["player", "mushroom", "golem", "goblin"]:
+            self.get_facing_frames(name)
+
+    def get_player_sprites(self):
+        if "player" not in self.frames:
+            width, height = 64, 64
+            nb_of_sprite = 4
+
+            sprite_sheet = self.load_sheet("assets/sprite/player/player_sprite.png")
+            self.frames["player"] = [sprite_sheet.subsurface(pygame.Rect(i * width, 0, width, height))
+                                     for i in range(nb_of_sprite)]
+
+        return self.frames["player"]
+
+    def get_monster_sprites(self):
+        if "monster" not in self.frames:
+            img_dict = {"mushroom": [],
+                        "golem": [],
+                        "goblin": []
+                        }
+            width, height = 64, 64
+            nb_of_sprite = 4
+            sprite_sheet = self.load_sheet("assets/sprite/enemy/enemy_sprite.png")
+
+            monsters = ["mushroom", "golem", "goblin"]
+
+            for row, monster in enumerate(monsters):
+                for col in range(nb_of_sprite):
+                    sprite = sprite_sheet.subsurface(pygame.Rect(col * width, row * height, width, height))
+                    img_dict[monster].append(sprite)
+
+            self.frames["monster"] = img_dict
+
+        return self.frames["monster"]
+
+    def get_facing_frames(self, name):
+        # right facing frames and their flipped copy for the left, each one with its mask
+        if name not in self.facing_frames:
+            sprites = self.get_player_sprites() if name == "player" else self.get_monster_sprites()[name]
+            flipped_sprites = [pygame.transform.flip(sprite, True, False) for sprite in sprites]
+
+            self.facing_frames[name] = {
+                True: [(sprite, pygame.mask.from_surface(sprite)) for sprite in sprites],
+                False: [(sprite, pygame.mask.from_surface(sprite)) for sprite in flipped_sprites]
+            }
+
+        return self.facing_frames[name]
+
+    def get_projectile_sprites(self):
+        if "projectile" not in self.frames:
+            img_dict = {"spear": {"normal": [], "collision": []},
+                        "fire_ball": {"normal": [], "collision": []}}
+
+            width, height = 64, 64
+            nb_of_normal_sprites = 3
+            nb_of_collision_sprites = 2
+
+            sprite_sheet = self.load_sheet("assets/sprite/projectile/projectile.png")
+
+            projectiles = ["spear", "fire_ball"]
+
+            for row, projectile in enumerate(projectiles):
+                for col in range(nb_of_normal_sprites + nb_of_collision_sprites):
+                    sprite = sprite_sheet.subsurface(pygame.Rect(col * width, row * height, width, height))
+                    if projectile == "spear":
+                        sprite = pygame.transform.scale_by(sprite, 1.5)
+                        sprite = pygame.transform.rotate(sprite, 45)
+
+                    state = "normal" if col < nb_of_normal_sprites else "collision"
+                    img_dict[projectile][state].append(sprite)
+
+            self.frames["projectile"] = img_dict
+
+        return self.frames["projectile"]
+
+    def get_rotated_projectile(self, projectile_type, state, index, angle):
+        # angle in radians like Bullet.angle, rounded to the nearest angle_step
+        bucket = round(-math.degrees(angle) / self.angle_step) % (360 // self.angle_step)
+        key = (projectile_type, state, index, bucket)
+
+        if key not in self.rotated_projectiles:
+            image = pygame.transform.rotate(self.get_projectile_sprites()[projectile_type][state][index],
+                                            bucket * self.angle_step)
+            self.rotated_projectiles[key] = (image, pygame.mask.from_surface(image))
+
+        return self.rotated_projectiles[key]
+
+
+assets = AssetManager()
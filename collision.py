@@ -0,0 +1,39 @@
+import numpy as np
+
+
+class CollisionStats:
+    # projectile pairs seen by each phase since the last reset (one tick), shown by the debug overlay
+    def __init__(self):
+        self.scanned_pairs = 0  # projectiles x targets, what testing every mask would cost
+        self.broad_pairs = 0  # rects overlapping, sent to the narrow phase
+        self.narrow_pairs = 0  # masks overlapping
+
+    def reset(self):
+        self.scanned_pairs = 0
+        self.broad_pairs = 0
+        self.narrow_pairs = 0
+
+
+collision_stats = CollisionStats()
+
+
+def overlapping_boxes(boxes, target_boxes):
+    # broad phase over the whole batch at once, boxes are (left, top, right, bottom) arrays,
+    # same test as FRect.colliderect -> (projectile indices, target indices), projectile by projectile
+    left, top, right, bottom = boxes
+    target_left, target_top, target_right, target_bottom = target_boxes
+    overlap = ((left[:, None] < target_right[None, :]) & (right[:, None] > target_left[None, :]) &
+               (top[:, None] < target_bottom[None, :]) & (bottom[:, None] > target_top[None, :]))
+    first, second = np.nonzero(overlap)
+
+    collision_stats.scanned_pairs += overlap.size
+    collision_stats.broad_pairs += len(first)
+    return first, second
+
+
+def mask_hit(mask, left, top, target):
+    # narrow phase, same offset as pygame.sprite.collide_mask(projectile, target)
+    if mask.overlap(target.mask, (target.rect[0] - left, target.rect[1] - top)):
+        collision_stats.narrow_pairs += 1
+        return True
+    return False
@@ -0,0 +1,351 @@
+import pygame
+import numpy as np
+import random
+
+from sprite import BorderSprite, REFERENCE_FPS
+from lod import LodScheduler, NEAR
+from struct_arrays import StructOfArrays
+
+# enemy_type -> kind stored in the arrays
+CLASSIC, STUPID, SMART = 0, 1, 2
+ENEMY_KINDS = {"classic": CLASSIC, "stupid": STUPID, "smart": SMART}
+
+# enemies used to be updated by all_sprites and enemy_group, keep the same pace with two steps per tick
+STEPS_PER_TICK = 2
+
+# border "properties" -> code, 0 for the stones and trunks
+BORDERS = {"left": 1, "right": 2, "top": 3, "bottom": 4}
+
+
+class EnemyEngine(StructOfArrays):
+    # every enemy simulated at once in numpy arrays (one slot per enemy), the Enemy sprites only keep
+    # their stats and get their rect, hitbox and frame written back once per tick for the drawing
+    def __init__(self, game, capacity=64):
+        fields = dict.fromkeys(["x", "y", "width", "height",  # rect
+                                "hitbox_x", "hitbox_y", "hitbox_width", "hitbox_height",
+                                "direction_x", "direction_y", "separation_x", "separation_y",
+                                "speed", "repulsion", "movement_timer", "shooting_cooldown",
+                                "animation_index", "animation_speed"], np.float64)
+        fields.update(dict.fromkeys(["kind", "frame_count"], np.int32))
+        fields["facing_right"] = np.bool_
+        super().__init__(fields, capacity)
+
+        self.game = game
+        self.enemies = []  # slot -> Enemy
+
+        self.colliders = np.zeros((0, 4))  # left, top, right, bottom
+        self.collider_borders = np.zeros(0, dtype=np.int8)
+        self.collider_index = {}  # collider sprite -> row in self.colliders
+        self.lod = LodScheduler()  # configured by Game.setup
+
+    def add(self, enemy, enemy_type, speed, repulsion, animation_speed):
+        i = self.new_slot()
+        self.enemies.append(enemy)
+
+        self.x[i], self.y[i] = enemy.rect.topleft
+        self.width[i], self.height[i] = enemy.rect.size
+        self.hitbox_x[i], self.hitbox_y[i] = enemy.hitbox.topleft
+        self.hitbox_width[i], self.hitbox_height[i] = enemy.hitbox.size
+        self.direction_x[i] = self.direction_y[i] = 0
+        self.separation_x[i] = self.separation_y[i] = 0
+        self.speed[i] = speed
+        self.repulsion[i] = repulsion
+        self.movement_timer[i] = 0
+        self.shooting_cooldown[i] = 0
+        self.animation_index[i] = 0
+        self.animation_speed[i] = animation_speed
+        self.kind[i] = ENEMY_KINDS[enemy_type]
+        self.frame_count[i] = len(enemy.frames[True])
+        self.facing_right[i] = True
+        return i
+
+    def remove(self, enemy):
+        # the last slot takes the place of the removed one
+        i, last = enemy.index, self.count - 1
+        if i is None:
+            return
+
+        self.swap_remove(i)
+        if i != last:
+            self.enemies[i] = self.enemies[last]
+            self.enemies[i].index = i
+
+        self.enemies.pop()
+        enemy.index = None
+
+    def set_colliders(self, collision_sprites):
+        # static for a whole game, called by Game.setup in the collision_sprites order
+        sprites = list(collision_sprites)
+        self.collider_index = {sprite: i for i, sprite in enumerate(sprites)}
+        self.colliders = np.array([(sprite.hitbox.left, sprite.hitbox.top, sprite.hitbox.right, sprite.hitbox.bottom)
+                                   for sprite in sprites], dtype=np.float64).reshape(-1, 4)
+        self.collider_borders = np.array([BORDERS.get(sprite.properties.get("border"), 0)
+                                          if isinstance(sprite, BorderSprite) else 0 for sprite in sprites],
+                                         dtype=np.int8)
+
+    def update(self, dt):
+        if not self.count:
+            return
+
+        if self.game.flow_field is not None:
+            self.game.flow_field.set_target(self.game.player.rect.center)
+
+        # near enemies make every step, the others one coarse step for the ticks they waited
+        n = self.count
+        tiers, step_dt = self.lod.schedule(self.hitbox_x[:n] + self.hitbox_width[:n] / 2,
+                                           self.hitbox_y[:n] + self.hitbox_height[:n] / 2,
+                                           self.game.all_sprites.camera_rect, dt)
+        near = tiers == NEAR
+        step_dt = np.where(near, step_dt, step_dt * STEPS_PER_TICK)
+        moved = np.flatnonzero(step_dt > 0)
+
+        self.separate()
+        for step in range(STEPS_PER_TICK):
+            if step:
+                step_dt = np.where(near, dt, 0.0)
+            self.steer(step_dt)
+            self.collide_player(near)
+            self.dodge_obstacles(step_dt > 0)
+            self.direction_x[:self.count] += self.separation_x[:self.count]
+            self.direction_y[:self.count] += self.separation_y[:self.count]
+            self.move(step_dt)
+            self.animate(step_dt, near)
+
+        # arrays -> sprites of the enemies that moved, through lists since reading numpy scalars one by one is slow
+        for i, x, y, hitbox_x, hitbox_y, facing_right, animation_index in zip(
+                moved.tolist(), self.x[moved].tolist(), self.y[moved].tolist(), self.hitbox_x[moved].tolist(),
+                self.hitbox_y[moved].tolist(), self.facing_right[moved].tolist(),
+                self.animation_index[moved].tolist()):
+            enemy = self.enemies[i]
+            enemy.rect.topleft = (x, y)
+            enemy.hitbox.topleft = (hitbox_x, hitbox_y)
+            enemy.image, enemy.mask = enemy.frames[facing_right][int(animation_index)]
+
+    def sync(self, i):
+        # arrays -> one sprite, for the few enemies that need an exact rect/mask during the step
+        enemy = self.enemies[i]
+        enemy.rect.topleft = (self.x[i], self.y[i])
+        enemy.hitbox.topleft = (self.hitbox_x[i], self.hitbox_y[i])
+        enemy.image, enemy.mask = enemy.frames[bool(self.facing_right[i])][int(self.animation_index[i])]
+
+    def separate(self):
+        # enemy/enemy push once per tick, each overlapping pair found once with a grid of hitbox sized cells:
+        # an enemy is only compared with its own cell and 4 of the 8 neighbours
+        n = self.count
+        self.separation_x[:n] = 0
+        self.separation_y[:n] = 0
+        if n < 2:
+            return
+
+        center_x = self.hitbox_x[:n] + self.hitbox_width[:n] / 2
+        center_y = self.hitbox_y[:n] + self.hitbox_height[:n] / 2
+        cell_width, cell_height = self.hitbox_width[:n].max(), self.hitbox_height[:n].max()
+        cell_x = np.floor(center_x / cell_width).astype(np.int64)
+        cell_y = np.floor(center_y / cell_height).astype(np.int64)
+
+        # cell key, rows far apart enough that a neighbour offset never wraps to another row
+        row_length = cell_x.max() - cell_x.min() + 3
+        cell_x -= cell_x.min() - 1
+        keys = cell_y * row_length + cell_x
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+
+        firsts, seconds = [], []
+        for offset_x, offset_y in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+            neighbour_keys = keys + offset_y * row_length + offset_x
+            starts = np.searchsorted(sorted_keys, neighbour_keys, "left")
+            counts = np.searchsorted(sorted_keys, neighbour_keys, "right") - starts
+            total = counts.sum()
+            if not total:
+                continue
+
+            first = np.repeat(np.arange(n), counts)
+            position = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(starts, counts)
+            second = order[position]
+            if (offset_x, offset_y) == (0, 0):
+                keep = first < second
+                first, second = first[keep], second[keep]
+            firsts.append(first)
+            seconds.append(second)
+
+        if not firsts:
+            return
+        first, second = np.concatenate(firsts), np.concatenate(seconds)
+
+        # same test as FRect.colliderect on the hitboxes
+        overlap = ((self.hitbox_x[first] < self.hitbox_x[second] + self.hitbox_width[second]) &
+                   (self.hitbox_x[first] + self.hitbox_width[first] > self.hitbox_x[second]) &
+                   (self.hitbox_y[first] < self.hitbox_y[second] + self.hitbox_height[second]) &
+                   (self.hitbox_y[first] + self.hitbox_height[first] > self.hitbox_y[second]))
+        first, second = first[overlap], second[overlap]
+
+        dodge_x = center_x[first] - center_x[second]
+        dodge_y = center_y[first] - center_y[second]
+        length = np.hypot(dodge_x, dodge_y)
+        apart = length > 0
+        first, second = first[apart], second[apart]
+        push = self.repulsion[first] / length[apart]
+        dodge_x, dodge_y = dodge_x[apart] * push, dodge_y[apart] * push
+
+        np.add.at(self.separation_x, first, dodge_x)
+        np.add.at(self.separation_y, first, dodge_y)
+        np.add.at(self.separation_x, second, -dodge_x)
+        np.add.at(self.separation_y, second, -dodge_y)
+
+    def steer(self, step_dt):
+        # classic = rush on player everywhere
+        # smart = follow player but stay dist > 300
+        # stupid = random mouvement and if dist < 300 rush player
+        # step_dt : dt of each enemy for this step, 0 for the ones waiting for their lod turn
+        n = self.count
+        active = step_dt > 0
+        player_x, player_y = self.game.player.rect.center
+        center_x = self.x[:n] + self.width[:n] / 2
+        center_y = self.y[:n] + self.height[:n] / 2
+        to_player_x, to_player_y = player_x - center_x, player_y - center_y
+        dist = np.hypot(to_player_x, to_player_y)
+        kind = self.kind[:n]
+
+        close = dist <= 300
+        chase = (kind == CLASSIC) | ((kind == SMART) & ~close) | ((kind == STUPID) & close)
+        chase &= dist > 0  # no direction to normalize, the last one is kept
+        self.direction_x[:n][chase] = to_player_x[chase] / dist[chase]
+        self.direction_y[:n][chase] = to_player_y[chase] / dist[chase]
+
+        # straight where the line to the player is clear, around the obstacles with the flow field elsewhere
+        flow_field = self.game.flow_field
+        if flow_field is not None:
+            flow_x, flow_y = flow_field.directions_at(center_x, center_y)
+            follow = chase & ((flow_x != 0) | (flow_y != 0))
+            self.direction_x[:n][follow] = flow_x[follow]
+            self.direction_y[:n][follow] = flow_y[follow]
+
+        wander = ((kind == SMART) & close) | ((kind == STUPID) & ~close)
+        new_direction = wander & active & (self.movement_timer[:n] <= 0)
+        waiting = wander & ~new_direction
+        self.movement_timer[:n][waiting] -= step_dt[waiting] * REFERENCE_FPS
+        for i in np.flatnonzero(new_direction):
+            self.movement_timer[i] = 300
+            direction = pygame.math.Vector2(random.uniform(-1, 1), random.uniform(-1, 1))
+            if direction:
+                self.direction_x[i], self.direction_y[i] = direction.normalize()
+
+        # smart ones run away when too close and shoot while they are in range
+        smart_close = (kind == SMART) & close
+        too_close = smart_close & (dist <= 50)
+        self.direction_x[:n][too_close] *= -1
+        self.direction_y[:n][too_close] *= -1
+
+        shoot = smart_close & active & (self.shooting_cooldown[:n] <= 0)
+        reloading = smart_close & ~shoot
+        self.shooting_cooldown[:n][reloading] -= step_dt[reloading] * REFERENCE_FPS
+        self.shooting_cooldown[:n][shoot] = 50
+        for i in np.flatnonzero(shoot):
+            self.sync(i)
+            self.enemies[i].shoot()
+
+    def collide_player(self, near):
+        # only the near tier can reach the player, it is in the middle of the camera
+        n = self.count
+        player = self.game.player
+        touching = np.flatnonzero(near &
+                                  (self.x[:n] < player.rect.right) & (self.x[:n] + self.width[:n] > player.rect.left) &
+                                  (self.y[:n] < player.rect.bottom) & (self.y[:n] + self.height[:n] > player.rect.top))
+
+        # rects overlap, the masks decide
+        for i in touching:
+            self.sync(i)
+            enemy = self.enemies[i]
+            if pygame.sprite.collide_mask(enemy, player):
+                if enemy.hitbox.right > player.hitbox.left and self.direction_x[i] > 0:
+                    self.direction_x[i] = 0
+                if enemy.hitbox.left < player.hitbox.right and self.direction_x[i] < 0:
+                    self.direction_x[i] = 0
+                if enemy.hitbox.bottom > player.hitbox.top and self.direction_y[i] > 0:
+                    self.direction_y[i] = 0
+                if enemy.hitbox.top < player.hitbox.bottom and self.direction_y[i] < 0:
+                    self.direction_y[i] = 0
+
+                player.damage(enemy.attack)
+
+    def dodge_obstacles(self, active):
+        # one collider at a time like before: a border pushes the hitbox out before the next collider is tested
+        # active : enemies moving during this step, the others haven't moved since their last check
+        n = self.count
+        hitbox_x, hitbox_y = self.hitbox_x[:n], self.hitbox_y[:n]
+        hitbox_width, hitbox_height = self.hitbox_width[:n], self.hitbox_height[:n]
+
+        for i in self.colliders_near(active):
+            (left, top, right, bottom), border = self.colliders[i], self.collider_borders[i]
+            hit = active & ((hitbox_x < right) & (hitbox_x + hitbox_width > left) &
+                            (hitbox_y < bottom) & (hitbox_y + hitbox_height > top))
+            if not hit.any():
+                continue
+
+            if border == BORDERS["left"]:
+                hitbox_x[hit] = right
+                self.x[:n][hit] = hitbox_x[hit]
+            elif border == BORDERS["right"]:
+                hitbox_x[hit] = left - hitbox_width[hit]
+                self.x[:n][hit] = left - self.width[:n][hit]
+            elif border == BORDERS["top"]:
+                hitbox_y[hit] = bottom
+                self.y[:n][hit] = hitbox_y[hit]
+            elif border == BORDERS["bottom"]:
+                hitbox_y[hit] = top - hitbox_height[hit]
+                self.y[:n][hit] = top - self.height[:n][hit]
+
+            if border:
+                hit &= ((hitbox_x < right) & (hitbox_x + hitbox_width > left) &
+                        (hitbox_y < bottom) & (hitbox_y + hitbox_height > top))
+
+            dodge_x = hitbox_x[hit] + hitbox_width[hit] / 2 - (left + right) / 2
+            dodge_y = hitbox_y[hit] + hitbox_height[hit] / 2 - (top + bottom) / 2
+            length = np.hypot(dodge_x, dodge_y)
+            length[length == 0] = np.inf  # centered on the collider, no push
+            self.direction_x[:n][hit] += dodge_x / length * self.repulsion[:n][hit]
+            self.direction_y[:n][hit] += dodge_y / length * self.repulsion[:n][hit]
+
+    def colliders_near(self, active):
+        # indices of the colliders sharing a collider_grid cell with a moving hitbox, in the collision_sprites order
+        moving = np.flatnonzero(active)
+        if not len(moving):
+            return []
+
+        grid = self.game.collider_grid
+        first_col = self.hitbox_x[moving] // grid.cell_size
+        first_row = self.hitbox_y[moving] // grid.cell_size
+        last_col = (self.hitbox_x[moving] + self.hitbox_width[moving] - 1) // grid.cell_size
+        last_row = (self.hitbox_y[moving] + self.hitbox_height[moving] - 1) // grid.cell_size
+
+        # a hitbox is smaller than a cell, its 4 corners give every cell it overlaps
+        cols = np.concatenate((first_col, last_col, first_col, last_col)).astype(np.int64)
+        rows = np.concatenate((first_row, first_row, last_row, last_row)).astype(np.int64)
+        cells = set(zip(cols.tolist(), rows.tolist()))
+        return sorted(self.collider_index[sprite] for sprite in grid.colliders_in(cells))
+
+    def move(self, step_dt):
+        n = self.count
+        direction_x, direction_y = self.direction_x[:n], self.direction_y[:n]
+        length = np.hypot(direction_x, direction_y)
+        moving = length > 0
+        direction_x[moving] /= length[moving]
+        direction_y[moving] /= length[moving]
+        moving &= step_dt > 0
+        self.facing_right[:n][moving] = direction_x[moving] > 0
+
+        step = self.speed[:n] * step_dt * REFERENCE_FPS
+        self.x[:n] += direction_x * step
+        self.y[:n] += direction_y * step
+
+        # hitbox centered on the rect again
+        self.hitbox_x[:n] = self.x[:n] + (self.width[:n] - self.hitbox_width[:n]) / 2
+        self.hitbox_y[:n] = self.y[:n] + (self.height[:n] - self.hitbox_height[:n]) / 2
+
+    def animate(self, step_dt, near):
+        # the far tiers keep their frame, nobody sees them
+        n = self.count
+        moving = near & ((self.direction_x[:n] != 0) | (self.direction_y[:n] != 0))
+        animation_index = self.animation_index[:n]
+        animation_index[moving] += self.animation_speed[:n][moving] * step_dt[moving] * REFERENCE_FPS
+        animation_index[animation_index >= self.frame_count[:n]] = 0
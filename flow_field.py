@@ -0,0 +1,129 @@
+import numpy as np
+from collections import deque
+
+# 8 neighbours, (column, row) offsets
+NEIGHBOURS = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+class FlowField:
+    # colliders rasterised once per map in a grid of cells, then one BFS from the player cell each time the
+    # player changes cell : every cell without a clear line to the player stores the direction of its next cell
+    def __init__(self, map_width, map_height, cell_size):
+        self.cell_size = cell_size
+        self.columns = int(np.ceil(map_width / cell_size))
+        self.rows = int(np.ceil(map_height / cell_size))
+        self.blocked = np.zeros((self.rows, self.columns), dtype=np.bool_)
+        self.distance = np.full((self.rows, self.columns), np.inf)
+        self.direction_x = np.zeros((self.rows, self.columns))
+        self.direction_y = np.zeros((self.rows, self.columns))
+        self.neighbours = []
+        self.target_cell = None
+        self.rebuilds = 0  # BFS runs, for the debug overlay
+
+    def rasterise(self, colliders):
+        # a cell is blocked when its rect overlaps a collider hitbox
+        for sprite in colliders:
+            first_col = max(0, int(sprite.hitbox.left // self.cell_size))
+            last_col = min(self.columns - 1, int((sprite.hitbox.right - 1) // self.cell_size))
+            first_row = max(0, int(sprite.hitbox.top // self.cell_size))
+            last_row = min(self.rows - 1, int((sprite.hitbox.bottom - 1) // self.cell_size))
+            self.blocked[first_row:last_row + 1, first_col:last_col + 1] = True
+
+        # free neighbours (4 sides) of every cell, by flat index row * columns + col
+        blocked = self.blocked.ravel().tolist()
+        self.neighbours = []
+        for row in range(self.rows):
+            for col in range(self.columns):
+                self.neighbours.append([next_row * self.columns + next_col
+                                        for next_col, next_row in ((col + 1, row), (col - 1, row),
+                                                                   (col, row + 1), (col, row - 1))
+                                        if 0 <= next_col < self.columns and 0 <= next_row < self.rows
+                                        and not blocked[next_row * self.columns + next_col]])
+        self.target_cell = None
+
+    def cell_of(self, pos):
+        return (min(self.columns - 1, max(0, int(pos[0] // self.cell_size))),
+                min(self.rows - 1, max(0, int(pos[1] // self.cell_size))))
+
+    def set_target(self, pos):
+        # nothing to do while the player stays in the same cell
+        target_cell = self.cell_of(pos)
+        if target_cell != self.target_cell:
+            self.target_cell = target_cell
+            self.compute()
+
+    def compute(self):
+        # BFS on the 4 sides, the player cell is a source even when it touches a collider
+        target_col, target_row = self.target_cell
+        target = target_row * self.columns + target_col
+        steps = [-1] * (self.rows * self.columns)
+        steps[target] = 0
+        neighbours = self.neighbours
+
+        queue = deque([target])
+        while queue:
+            cell = queue.popleft()
+            step = steps[cell] + 1
+            for next_cell in neighbours[cell]:
+                if steps[next_cell] < 0:
+                    steps[next_cell] = step
+                    queue.append(next_cell)
+
+        distance = np.array(steps, dtype=np.float64).reshape(self.rows, self.columns)
+        distance[distance < 0] = np.inf
+        self.distance = distance
+        self.compute_directions()
+        # no direction where the line to the player is clear, the enemies there go straight at the player
+        rows, cols = self.clear_lines()
+        self.direction_x[rows, cols] = 0
+        self.direction_y[rows, cols] = 0
+        self.rebuilds += 1
+
+    def compute_directions(self):
+        # each cell points to the neighbour that gets closest to the player per pixel walked,
+        # diagonals only when both sides are free (no corner cutting)
+        padded = np.pad(self.distance, 1, constant_values=np.inf)
+        reachable = np.isfinite(self.distance)
+        best_gain = np.zeros_like(self.distance)
+        direction_x = np.zeros_like(self.distance)
+        direction_y = np.zeros_like(self.distance)
+
+        for offset_col, offset_row in NEIGHBOURS:
+            neighbour = padded[1 + offset_row:1 + offset_row + self.rows, 1 + offset_col:1 + offset_col + self.columns]
+            if offset_col and offset_row:
+                side_col = padded[1:1 + self.rows, 1 + offset_col:1 + offset_col + self.columns]
+                side_row = padded[1 + offset_row:1 + offset_row + self.rows, 1:1 + self.columns]
+                neighbour = np.where(np.isfinite(side_col) & np.isfinite(side_row), neighbour, np.inf)
+
+            with np.errstate(invalid="ignore"):
+                gain = (self.distance - neighbour) / np.hypot(offset_col, offset_row)
+            better = reachable & (gain > best_gain)
+            best_gain[better] = gain[better]
+            direction_x[better] = offset_col
+            direction_y[better] = offset_row
+
+        length = np.hypot(direction_x, direction_y)
+        length[length == 0] = 1
+        self.direction_x = direction_x / length
+        self.direction_y = direction_y / length
+
+    def clear_lines(self):
+        # (rows, cols) of the reachable cells whose center sees the center of the player cell without crossing
+        # a blocked cell, the line is sampled at least every half cell and the player cell itself doesn't block
+        target_col, target_row = self.target_cell
+        blocked = self.blocked.ravel().copy()
+        blocked[target_row * self.columns + target_col] = False
+
+        rows, cols = np.nonzero(np.isfinite(self.distance))
+        samples = 2 * max(target_col, self.columns - 1 - target_col, target_row, self.rows - 1 - target_row) + 1
+        t = np.linspace(0, 1, samples, dtype=np.float32)[:, None]
+        sample_cols = (cols + np.float32(0.5) + (target_col - cols).astype(np.float32) * t).astype(np.int32)
+        sample_rows = (rows + np.float32(0.5) + (target_row - rows).astype(np.float32) * t).astype(np.int32)
+        clear = ~blocked[sample_rows * self.columns + sample_cols].any(axis=0)
+        return rows[clear], cols[clear]
+
+    def directions_at(self, x, y):
+        # x, y : arrays of positions, (0, 0) where the line to the player is clear or the player can't be reached
+        cols = np.clip((x // self.cell_size).astype(np.int64), 0, self.columns - 1)
+        rows = np.clip((y // self.cell_size).astype(np.int64), 0, self.rows - 1)
+        return self.direction_x[rows, cols], self.direction_y[rows, cols]
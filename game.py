@@ -1,13 +1,19 @@
 import pygame
 import random
-import pytmx
 import json
 import math
+import time
 
-from sprite import Sprite, AllSprite, BorderSprite, CollidableSprite
+from sprite import Sprite, AllSprite, BorderSprite, CollidableSprite, ChunkedLayer, ColliderGrid, REFERENCE_FPS
 from player import Player
 from enemy import EnemySpawner, Enemy
-from item import Item
+from hud import Hud
+from projectile import ProjectileManager
+from flow_field import FlowField
+from collision import collision_stats
+from map_loader import load_map
+from asset_manager import assets
+from game_management import font_registry, display, startup_profiler
 
 
 class Game:
@@ -19,8 +25,10 @@ class Game:
         self.color_manager = color_manager
 
         # font, background
-        self.font = pygame.font.Font("assets/font.ttf", size=30)
+        self.font = font_registry.get_font(30)
         self.rgb_color = random.randint(0, 90), random.randint(0, 90), random.randint(0, 90)
+        self.background = None  # gradient cached by self.draw_background()
+        self.background_key = None
 
         # keyboard setup
         self.configurations = None  # used in self.import_config()
@@ -29,11 +37,26 @@ class Game:
         self.mouse_pos = ()
         self.mouse_angle = None
         self.pause = False
+        self.debug_mode = False  # masks, hitboxes and colliders overlay, toggled with the "debug" key
         self.import_config()
 
+        # hud (stats, exp/hp bars, round timer)
+        self.hud = Hud(self)
+
         # groups
-        self.all_sprites = AllSprite()
+        self.all_sprites = AllSprite(self.screen)
         self.collision_sprites = pygame.sprite.Group()
+        self.collidable_sprites = pygame.sprite.Group()  # stones and trunks only, what projectiles stop on
+        self.collider_grid = ColliderGrid()  # same sprites as collision_sprites, queried by area
+        self.flow_field = None  # FlowField toward the player, built by self.setup
+
+        # typed registries next to all_sprites, kill() removes a sprite from all of them
+        # (the enemies are in self.enemy_spawner.enemy_group, the projectiles are not sprites)
+        self.items = pygame.sprite.Group()
+
+        # fire balls and spears of both factions, the starting capacity is "projectiles" in others/setting.json
+        self.projectiles = ProjectileManager(self, **self.configurations.get("projectiles", {}))
+        self.all_sprites.projectiles = self.projectiles
 
         # game setup
         self.temporary_save = {}
@@ -71,16 +94,21 @@ class Game:
         self.tile_size = 16
         self.new_tile_size = 64
         self.scaling = 4
-        self.import_assets()
+        self.baked_layers = {}  # scaling -> ChunkedLayer of the "map" layer
+        self.tile_surfaces = {}  # (gid, tile size) -> scaled surface shared by every tile using it
+        self.tmx_maps = {}  # loaded by self.import_assets() when the first game starts
         self.layer_drawing_order = {
             "bg": 0,
             "main": 1,
             "fg": 2
         }
 
-    def run(self):
+    def update(self, dt=1 / REFERENCE_FPS):
+        # one fixed simulation tick, dt in seconds
         if not self.pause:
             if not self.load_setup:
+                if not self.tmx_maps:
+                    self.import_assets()
                 self.start_time = pygame.time.get_ticks()
                 self.check_map_size(self.tmx_maps["world"])
                 self.setup(self.tmx_maps["world"], "player_spawn")
@@ -88,11 +116,24 @@ class Game:
 
             self.handle_input()
             self.check_game_state()
-            self.draw_background()
             self.spawn_timer()
-            self.all_sprites.update()
-            self.enemy_spawner.enemy_group.update()
-            self.all_sprites.draw(self.player.rect.center, self.map_width, self.map_height)
+            self.all_sprites.store_previous_positions()
+            collision_stats.reset()
+            self.projectiles.update(dt)
+            self.all_sprites.update(dt)
+            self.enemy_spawner.update(dt)
+            if not self.player.death:
+                self.update_timer()
+
+    def draw(self, alpha=1):
+        # alpha : progress between the last two ticks, used to interpolate the moving sprites
+        if not self.pause and self.load_setup:
+            self.draw_background()
+            self.all_sprites.draw(self.all_sprites.interpolated_center(self.player, alpha),
+                                  self.map_width, self.map_height, alpha)
+            if self.debug_mode:
+                self.all_sprites.draw_debug(self.collision_sprites, alpha)
+                self.draw_debug_stats()
             self.front_drawings()
 
     def handle_input(self):
@@ -103,6 +144,9 @@ class Game:
                         self.keys = {}
                         self.pause = True
                         self.game_state_manager.set_state("pause")
+                    if key == 'debug':
+                        self.keys[getattr(pygame, f"K_{value}")] = False
+                        self.debug_mode = not self.debug_mode
 
     def check_game_state(self):
         if self.player.health <= 0:
@@ -110,7 +154,7 @@ class Game:
             self.delete_save()
             self.clearing_sprites_group()
             self.clearing_enemy_and_item()
-            pygame.display.update()
+            display.update()
             self.game_state_manager.set_state("death_menu")
 
         if self.game_state_manager.get_previous_state() == "round_menu" and self.round_menu:
@@ -134,84 +178,30 @@ class Game:
 
     def front_drawings(self):
         if not self.player.death:
-            self.drawing_surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-
-            self.draw_stats(self.drawing_surface)
-            self.draw_timer(self.drawing_surface)
-            self.screen.blit(self.drawing_surface, (0, 0))
-
-    def draw_stats(self, surface):
-        # stats
-        stats_to_draw = {
-            "round": self.actual_round,
-            "lvl": self.player.level,
-            "next_lvl": int(round((self.player.base_experience * ((self.player.level ** 2) / 2)),
-                                  ndigits=1)) if self.player.level > 1 else self.player.base_experience,
-            "hp": self.player.health,
-            "atk": self.player.attack,
-            "def": self.player.defense,
-            "bullet cd": self.player.bullet_cd,
-            "bullet spd": self.player.bullet_spd
-        }
-
-        stats_surface_width = 40 * self.scaling + 65
-        stats_surface_height = 80 * self.scaling
-        pygame.draw.rect(surface, (128, 128, 128, 128),
-                         (10, self.height // 2 - stats_surface_height // 2, stats_surface_width, stats_surface_height))
-
-        font_for_stats = pygame.font.Font("assets/font.ttf", size=6 * self.scaling)
-        for i, (keys, value) in enumerate(stats_to_draw.items()):
-            color_for_stats = "black"
-            base_y = (self.height // 2 - stats_surface_height // 2) + i * 9 * self.scaling
-
-            if keys == "round":
-                color_for_stats = "red3"
-
-            if keys == "lvl":
-                base_y += 10
-
-            if keys == "next_lvl":
-                base_y += 10
-                max_width = stats_surface_width - 20
-                current_experience = self.player.experience
-                next_lvl_experience = stats_to_draw["next_lvl"]
-                progress_exp = max(0, min(max_width, (current_experience / next_lvl_experience) * max_width))
-                # min : if % obtain >= max_width, progress_width will stop at max_width
-                # max : if % obtain < 0, progress_width will always be at 0
-
-                pygame.draw.rect(surface, "grey25", (20, base_y, max_width, 20))
-                pygame.draw.rect(surface, "orangered", (20, base_y, progress_exp, 20))
-
-                font_for_exp = pygame.font.Font("assets/font.ttf", size=12)
-                stats_text = font_for_exp.render(f"{current_experience}/{next_lvl_experience}",
-                                                 True, "white")
-                surface.blit(stats_text, ((20 + stats_surface_width) // 2 - stats_text.get_width() // 2,
-                                          (base_y + 20 - stats_text.get_height())))
-
-            elif keys == "hp":
-                base_y += 10
-                max_width = stats_surface_width - 20
-                max_hp = self.player.base_health
-                current_hp = self.player.health
-                progress_hp = max(0, min(max_width, (current_hp / max_hp) * max_width))
-
-                pygame.draw.rect(surface, "grey25", (20, base_y, max_width, 30))
-                pygame.draw.rect(surface, "red", (20, base_y, progress_hp, 30))
-
-                font_for_hp = pygame.font.Font("assets/font.ttf", size=15)
-                stats_text = font_for_hp.render(f"{keys.capitalize()}: {current_hp}/{max_hp}",
-                                                True, color_for_stats)
-                surface.blit(stats_text, ((20 + stats_surface_width) // 2 - stats_text.get_width() // 2,
-                                          (base_y + 25 - stats_text.get_height())))
-
-            else:
-                if keys in ["atk", "def", "bullet cd", "bullet spd"]:
-                    base_y += 15
-
-                stats_text = font_for_stats.render(f"{keys.capitalize()}: {value}", True, color_for_stats)
-                surface.blit(stats_text, ((20 + stats_surface_width) // 2 - stats_text.get_width() // 2, base_y))
-
-    def draw_timer(self, surface):
+            self.hud.draw(self.screen)
+
+    def draw_debug_stats(self):
+        # projectile pairs of the last tick : full scan / rect broad phase / mask narrow phase
+        self.color_manager.draw_text(f"projectile pairs  scan {collision_stats.scanned_pairs}  "
+                                     f"rect {collision_stats.broad_pairs}  mask {collision_stats.narrow_pairs}",
+                                     20, "white", 10, self.height - 30, centered=False)
+        # none between clearing_sprites_group and the next setup, the last frame after death is still drawn
+        if self.flow_field is not None:
+            self.color_manager.draw_text(f"flow field rebuilds {self.flow_field.rebuilds}",
+                                         20, "white", 10, self.height - 55, centered=False)
+
+        # enemies per lod tier, and how many of them moved during the last tick
+        lod = self.enemy_spawner.engine.lod
+        self.color_manager.draw_text(f"enemy lod  near {lod.counts['near']}  far {lod.counts['far']}  "
+                                     f"dormant {lod.counts['dormant']}  updated {lod.updated}",
+                                     20, "white", 10, self.height - 80, centered=False)
+
+        # exhausted = shots that found every slot taken
+        self.color_manager.draw_text(f"projectiles  live {self.projectiles.count}  "
+                                     f"capacity {self.projectiles.capacity}  exhausted {self.projectiles.exhausted}",
+                                     20, "white", 10, self.height - 105, centered=False)
+
+    def update_timer(self):
         # timer
         if self.pause:
             if self.pause_start_time == 0:
@@ -227,14 +217,6 @@ class Game:
             self.previous_time = self.actual_time
 
         self.time_before_next_round = self.time_per_round - self.actual_time
-        minutes = (self.time_per_round - self.actual_time) // 60
-        seconds = (self.time_per_round - self.actual_time) % 60
-        time_text = self.font.render(f"{minutes:02}:{seconds:02}", True, "orangered2")
-
-        pygame.draw.rect(surface, (128, 128, 128, 128),
-                         ((self.width // 2 - time_text.get_width() // 2), 25,
-                          time_text.get_width() + 2, time_text.get_height()))
-        surface.blit(time_text, ((self.width // 2 - time_text.get_width() // 2), 25))
 
     def spawn_timer(self):
         if not self.player.death:
@@ -266,6 +248,17 @@ class Game:
                 self.enemy_spawner.spawn_enemy(self.actual_round)
 
     def draw_background(self):
+        # the gradient only depends on the color and the screen size, rebuild it when one of them changes
+        background_key = (self.rgb_color, self.width, self.height)
+        if self.background_key != background_key:
+            self.background = self.create_background()
+            self.background_key = background_key
+
+        self.screen.blit(self.background, (0, 0))
+
+    def create_background(self):
+        # 1px wide strip, then stretched horizontally in one scale
+        strip = pygame.Surface((1, self.height))
         for y in range(self.height):
             interpolation = y / self.height
             color = (
@@ -273,7 +266,9 @@ class Game:
                 int(((1 - interpolation) * 0) + (interpolation * self.rgb_color[1])),
                 int(((1 - interpolation) * 0) + (interpolation * self.rgb_color[2]))
             )
-            pygame.draw.line(self.screen, color, (0, y), (self.width, y))
+            strip.set_at((0, y), color)
+
+        return pygame.transform.scale(strip, (self.width, self.height)).convert()
 
     def get_mouse_angle(self):
         mouse_pos_on_map = (self.mouse_pos[0] - self.all_sprites.offset.x,
@@ -288,24 +283,49 @@ class Game:
             self.configurations = json.load(f)
 
     def import_assets(self):
-        self.tmx_maps = {"world": pytmx.util_pygame.load_pygame("assets/map/map.tmx")}
+        # compiled map cache, rebuilt from the .tmx when it changed
+        begin = time.perf_counter()
+        self.tmx_maps = {"world": load_map("assets/map/map.tmx", "others/map.cache")}
+        assets.preload()
+        startup_profiler.mark("game assets", begin)
 
     def check_map_size(self, tmx_map):
-        self.new_tile_size = 48 if self.width == 1280 else 64
-        self.scaling = 3 if self.width == 1280 else 4
+        # 720p canvas -> 3 (48px tiles), 1080p canvas -> 4 (64px tiles), the speeds and sprites are tuned for those
+        self.scaling = 3 if self.height < 1080 else 4
+        self.new_tile_size = self.tile_size * self.scaling
 
         self.map_width = tmx_map.width * (self.tile_size * self.scaling)
         self.map_height = tmx_map.height * (self.tile_size * self.scaling)
 
+    def get_tile_surface(self, tmx_map, gid):
+        # tiled gids keep the flip flags, so each flipped/rotated variant of a tile has its own gid
+        key = (gid, self.new_tile_size)
+        if key not in self.tile_surfaces:
+            self.tile_surfaces[key] = pygame.transform.scale(tmx_map.get_tile_image(gid),
+                                                             (self.new_tile_size, self.new_tile_size))
+        return self.tile_surfaces[key]
+
+    def layer_tiles(self, tmx_map, layer):
+        for x, y, gid in tmx_map.get_layer_by_name(layer).iter_data():
+            if gid:
+                yield x, y, self.get_tile_surface(tmx_map, gid)
+
+    def bake_background(self, tmx_map):
+        # the "map" layer never changes, bake it once per scaling instead of creating a Sprite per tile
+        if self.scaling not in self.baked_layers:
+            bg_layer = ChunkedLayer(self.map_width, self.map_height)
+            for x, y, surf in self.layer_tiles(tmx_map, "map"):
+                bg_layer.add_tile((x * self.tile_size * self.scaling, y * self.tile_size * self.scaling), surf)
+            self.baked_layers[self.scaling] = bg_layer
+
+        return self.baked_layers[self.scaling]
+
     def setup(self, tmx_map, player_start_pos):
         # map and decoration
-        for layer in ["map", "map_decoration", "obj_decoration"]:
-            for x, y, surf in tmx_map.get_layer_by_name(layer).tiles():
-                surf = pygame.transform.scale(surf, (self.new_tile_size, self.new_tile_size))
-                if layer == "map":
-                    Sprite((x * self.tile_size * self.scaling, y * self.tile_size * self.scaling), surf,
-                           self.all_sprites, self.layer_drawing_order["bg"])
-                elif layer == "map_decoration":
+        self.all_sprites.bg_layer = self.bake_background(tmx_map)
+        for layer in ["map_decoration", "obj_decoration"]:
+            for x, y, surf in self.layer_tiles(tmx_map, layer):
+                if layer == "map_decoration":
                     Sprite((x * self.tile_size * self.scaling, y * self.tile_size * self.scaling), surf,
                            self.all_sprites, self.layer_drawing_order["main"])
                 else:
@@ -322,7 +342,17 @@ class Game:
         for obj in tmx_map.get_layer_by_name("collision_obj"):
             CollidableSprite((obj.x * self.scaling, obj.y * self.scaling),
                              pygame.Surface((obj.width * self.scaling, obj.height * self.scaling)),
-                             self.collision_sprites)
+                             [self.collision_sprites, self.collidable_sprites])
+
+        for sprite in self.collision_sprites:
+            self.collider_grid.add(sprite)
+        self.enemy_spawner.engine.set_colliders(self.collision_sprites)
+        self.projectiles.set_colliders(self.collidable_sprites)
+        self.enemy_spawner.engine.lod.configure(**self.configurations.get("enemy_lod", {}))
+
+        # enemies path around the colliders, one cell per tile
+        self.flow_field = FlowField(self.map_width, self.map_height, self.new_tile_size)
+        self.flow_field.rasterise(self.collision_sprites)
 
         # enemy spawn
         for obj in tmx_map.get_layer_by_name("enemy"):
@@ -389,15 +419,20 @@ class Game:
         self.player.rect.topleft = self.player.starting_pos
 
     def clearing_sprites_group(self):
+        self.projectiles.clear()
         self.all_sprites.empty()
+        self.all_sprites.bg_layer = None
         self.collision_sprites.empty()
+        self.collidable_sprites.empty()
+        self.collider_grid.clear()
+        self.flow_field = None
+        self.items.empty()
 
     def clearing_enemy_and_item(self):
         for enemy in self.enemy_spawner.enemy_group:
             enemy.kill()
-        for potion in self.all_sprites:
-            if isinstance(potion, Item):
-                potion.kill()
+        for potion in self.items:
+            potion.kill()
 
     def next_round(self):
         self.clearing_enemy_and_item()
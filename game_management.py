@@ -1,4 +1,6 @@
 import pygame
+import time
+from collections import OrderedDict
 
 
 class GameStateManager:
@@ -21,6 +23,118 @@ class GameStateManager:
         self.set_state(state)
 
 
+class StateRegistry:
+    # each state is built the first time it is asked, not all of them before the first frame
+    def __init__(self):
+        self.factories = {}
+        self.states = {}
+
+    def register(self, name, factory):
+        self.factories[name] = factory
+
+    def __getitem__(self, name):
+        if name not in self.states:
+            begin = time.perf_counter()
+            self.states[name] = self.factories[name]()
+            startup_profiler.mark(f"{name} state", begin)
+        return self.states[name]
+
+
+class StartupProfiler:
+    # time of each startup step, printed when the game is launched with --profile-startup
+    def __init__(self):
+        self.enabled = False
+        self.begin = time.perf_counter()
+        self.last = self.begin
+        self.steps = {}  # step -> ms, a step is only measured the first time
+
+    def start(self, begin, enabled):
+        self.begin = begin
+        self.last = begin
+        self.enabled = enabled
+
+    def mark(self, step, since=None):
+        # ms since the previous mark, or since `since` (perf_counter) for steps nested in another one
+        now = time.perf_counter()
+        if step not in self.steps:
+            self.steps[step] = (now - (self.last if since is None else since)) * 1000
+            if since is None:
+                self.last = now
+            if self.enabled:
+                print(f"[startup] {step:<16} {self.steps[step]:8.1f} ms   total {(now - self.begin) * 1000:8.1f} ms")
+
+
+startup_profiler = StartupProfiler()
+
+
+# the world (tile scaling 3 or 4) and the menus are laid out for these canvas sizes only
+CANVAS_SIZES = [(1280, 720), (1920, 1080)]
+
+
+class Display:
+    # everything is drawn on a canvas of fixed size, scaled once to the window when presented
+    def __init__(self):
+        self.canvas = None
+        self.window = None
+        self.window_size = None
+        self.viewport = None
+
+    def set_mode(self, render_resolution, window_size):
+        # the render resolution only picks the canvas size, 1080p from 1080 lines up and 720p below
+        pygame.display.set_mode(window_size, pygame.RESIZABLE)
+        self.canvas = pygame.Surface(CANVAS_SIZES[1] if render_resolution[1] >= 1080 else CANVAS_SIZES[0]).convert()
+        return self.canvas
+
+    def resize_window(self, window_size):
+        pygame.display.set_mode(window_size, pygame.RESIZABLE)
+
+    def get_viewport(self):
+        # biggest rect with the canvas ratio inside the window, the rest stays black
+        window = pygame.display.get_surface()
+        if window is not self.window or window.get_size() != self.window_size:
+            self.window = window
+            self.window_size = window.get_size()
+            ratio = min(window.get_width() / self.canvas.get_width(), window.get_height() / self.canvas.get_height())
+            self.viewport = pygame.Rect(0, 0, self.canvas.get_width() * ratio, self.canvas.get_height() * ratio)
+            self.viewport.center = window.get_rect().center
+            self.window.fill("black")
+
+        return self.viewport
+
+    def get_mouse_pos(self):
+        # window position -> canvas position
+        viewport = self.get_viewport()
+        mouse_x, mouse_y = pygame.mouse.get_pos()
+        return (int((mouse_x - viewport.x) * self.canvas.get_width() / viewport.width),
+                int((mouse_y - viewport.y) * self.canvas.get_height() / viewport.height))
+
+    def update(self):
+        viewport = self.get_viewport()
+        if viewport.size == self.canvas.get_size():
+            self.window.blit(self.canvas, viewport)
+        else:
+            pygame.transform.scale(self.canvas, viewport.size, self.window.subsurface(viewport))
+        pygame.display.update()
+
+
+display = Display()
+
+
+class FontRegistry:
+    # one pygame Font per size, loaded from disk the first time it is asked
+    def __init__(self, font_path):
+        self.font_path = font_path
+        self.fonts = {}
+
+    def get_font(self, size):
+        if size not in self.fonts:
+            self.fonts[size] = pygame.font.Font(self.font_path, size)
+        return self.fonts[size]
+
+
+font_registry = FontRegistry("assets/font.ttf")
+
+
 class ColorManager:
     def __init__(self, screen):
         self.screen = screen
@@ -29,10 +143,32 @@ class ColorManager:
         self.minimum = 0
         self.maximum = 255
 
+        # rendered text surfaces, least recently used are dropped first
+        self.text_cache = OrderedDict()
+        self.text_cache_size = 512
+        self.text_cache_hits = 0
+        self.text_cache_misses = 0
+
+    def render_text(self, text, size, color, opacity=255):
+        # color can be a name or a list modified in place by color_change, so the key uses its current value
+        key = (text, size, tuple(pygame.Color(color)), opacity)
+        text_surface = self.text_cache.get(key)
+
+        if text_surface is not None:
+            self.text_cache.move_to_end(key)
+            self.text_cache_hits += 1
+        else:
+            text_surface = font_registry.get_font(size).render(text, True, color)
+            text_surface.set_alpha(opacity)
+            self.text_cache[key] = text_surface
+            self.text_cache_misses += 1
+            if len(self.text_cache) > self.text_cache_size:
+                self.text_cache.popitem(last=False)
+
+        return text_surface
+
     def draw_text(self, text, size, color, x, y, opacity=255, surf=None, centered=True):
-        font = pygame.font.Font("../Pong/assets/font.ttf", size)
-        text_surface = font.render(text, True, color)
-        text_surface.set_alpha(opacity)
+        text_surface = self.render_text(text, size, color, opacity)
         text_rect = text_surface.get_rect()
         if centered:
             text_rect.center = (x, y)
@@ -45,12 +181,12 @@ class ColorManager:
             self.screen.blit(text_surface, text_rect)
 
     def get_text_rect(self, text, size, x, y, color=(255, 255, 255), centered=True):
-        font = pygame.font.Font("assets/font.ttf", size)
-        text_surface = font.render(text, True, color)
+        # only the size is needed, no need to render the text
+        text_rect = pygame.Rect((0, 0), font_registry.get_font(size).size(text))
         if centered:
-            text_rect = text_surface.get_rect(center=(x, y))
+            text_rect.center = (x, y)
         else:
-            text_rect = text_surface.get_rect(topleft=(x, y))
+            text_rect.topleft = (x, y)
 
         return text_rect
 
@@ -0,0 +1,162 @@
+import pygame
+
+from game_management import font_registry
+
+
+class HudWidget:
+    # keeps its rendered surface until the value it shows changes,
+    # the widgets below give get_value() and render(value)
+    def __init__(self, hud):
+        self.hud = hud
+        self.game = hud.game
+        self.value = None
+        self.surface = None
+        self.pos = (0, 0)
+
+    def refresh(self):
+        value = self.get_value()
+        if self.surface is None or value != self.value:
+            self.value = value
+            self.surface = self.render(value)
+            return True
+        return False
+
+    def get_rect(self):
+        return self.surface.get_rect(topleft=self.pos)
+
+    def stats_layout(self):
+        stats_surface_width = 40 * self.game.scaling + 65
+        stats_surface_height = 80 * self.game.scaling
+        top = self.game.height // 2 - stats_surface_height // 2
+        return stats_surface_width, stats_surface_height, top
+
+
+class StatsPanel(HudWidget):
+    def get_value(self):
+        player = self.game.player
+        return (self.game.height, self.game.scaling, self.game.actual_round, player.level, player.attack,
+                player.defense, player.bullet_cd, player.bullet_spd)
+
+    def render(self, value):
+        height, scaling, actual_round, level, attack, defense, bullet_cd, bullet_spd = value
+        stats_surface_width, stats_surface_height, top = self.stats_layout()
+        self.pos = (10, top)
+
+        surface = pygame.Surface((stats_surface_width, stats_surface_height), pygame.SRCALPHA)
+        pygame.draw.rect(surface, (128, 128, 128, 128), (0, 0, stats_surface_width, stats_surface_height))
+
+        # index is the row in the panel, bars take the rows 2 (exp) and 3 (hp)
+        stats_to_draw = [
+            (0, "round", actual_round, 0),
+            (1, "lvl", level, 10),
+            (4, "atk", attack, 15),
+            (5, "def", defense, 15),
+            (6, "bullet cd", bullet_cd, 15),
+            (7, "bullet spd", bullet_spd, 15)
+        ]
+
+        font_for_stats = self.hud.get_font(6 * scaling)
+        for i, keys, value, margin in stats_to_draw:
+            color_for_stats = "red3" if keys == "round" else "black"
+            base_y = i * 9 * scaling + margin
+
+            stats_text = font_for_stats.render(f"{keys.capitalize()}: {value}", True, color_for_stats)
+            surface.blit(stats_text, ((20 + stats_surface_width) // 2 - stats_text.get_width() // 2 - self.pos[0],
+                                      base_y))
+        return surface
+
+
+class ExperienceBar(HudWidget):
+    def get_value(self):
+        player = self.game.player
+        next_lvl_experience = int(round((player.base_experience * ((player.level ** 2) / 2)),
+                                        ndigits=1)) if player.level > 1 else player.base_experience
+        return self.game.height, self.game.scaling, player.experience, next_lvl_experience
+
+    def render(self, value):
+        height, scaling, current_experience, next_lvl_experience = value
+        stats_surface_width, stats_surface_height, top = self.stats_layout()
+        max_width = stats_surface_width - 20
+        self.pos = (20, top + 2 * 9 * scaling + 10)
+
+        progress_exp = max(0, min(max_width, (current_experience / next_lvl_experience) * max_width))
+        # min : if % obtain >= max_width, progress_width will stop at max_width
+        # max : if % obtain < 0, progress_width will always be at 0
+
+        surface = pygame.Surface((max_width, 20), pygame.SRCALPHA)
+        pygame.draw.rect(surface, "grey25", (0, 0, max_width, 20))
+        pygame.draw.rect(surface, "orangered", (0, 0, progress_exp, 20))
+
+        stats_text = self.hud.get_font(12).render(f"{current_experience}/{next_lvl_experience}", True, "white")
+        surface.blit(stats_text, ((20 + stats_surface_width) // 2 - stats_text.get_width() // 2 - self.pos[0],
+                                  20 - stats_text.get_height()))
+        return surface
+
+
+class HealthBar(HudWidget):
+    def get_value(self):
+        return self.game.height, self.game.scaling, self.game.player.health, self.game.player.base_health
+
+    def render(self, value):
+        height, scaling, current_hp, max_hp = value
+        stats_surface_width, stats_surface_height, top = self.stats_layout()
+        max_width = stats_surface_width - 20
+        self.pos = (20, top + 3 * 9 * scaling + 10)
+
+        progress_hp = max(0, min(max_width, (current_hp / max_hp) * max_width))
+
+        surface = pygame.Surface((max_width, 30), pygame.SRCALPHA)
+        pygame.draw.rect(surface, "grey25", (0, 0, max_width, 30))
+        pygame.draw.rect(surface, "red", (0, 0, progress_hp, 30))
+
+        stats_text = self.hud.get_font(15).render(f"Hp: {current_hp}/{max_hp}", True, "black")
+        surface.blit(stats_text, ((20 + stats_surface_width) // 2 - stats_text.get_width() // 2 - self.pos[0],
+                                  25 - stats_text.get_height()))
+        return surface
+
+
+class RoundTimer(HudWidget):
+    def get_value(self):
+        remaining_time = self.game.time_per_round - self.game.actual_time
+        return self.game.width, remaining_time // 60, remaining_time % 60
+
+    def render(self, value):
+        width, minutes, seconds = value
+        time_text = self.hud.get_font(30).render(f"{minutes:02}:{seconds:02}", True, "orangered2")
+        self.pos = (width // 2 - time_text.get_width() // 2, 25)
+
+        surface = pygame.Surface((time_text.get_width() + 2, time_text.get_height()), pygame.SRCALPHA)
+        pygame.draw.rect(surface, (128, 128, 128, 128), (0, 0, time_text.get_width() + 2, time_text.get_height()))
+        surface.blit(time_text, (0, 0))
+        return surface
+
+
+class Hud:
+    def __init__(self, game):
+        self.game = game
+        self.overlay = None
+        self.widgets = [StatsPanel(self), ExperienceBar(self), HealthBar(self), RoundTimer(self)]
+
+    def get_font(self, size):
+        return font_registry.get_font(size)
+
+    def draw(self, screen):
+        size = (self.game.width, self.game.height)
+        dirty = False
+        if self.overlay is None or self.overlay.get_size() != size:
+            self.overlay = pygame.Surface(size, pygame.SRCALPHA)
+            dirty = True
+
+        # every widget is refreshed, only the ones whose value changed are rendered again
+        for widget in self.widgets:
+            if widget.refresh():
+                dirty = True
+
+        if dirty:
+            self.overlay.fill((0, 0, 0, 0))
+            for widget in self.widgets:
+                self.overlay.blit(widget.surface, widget.pos)
+
+        # only the widget areas of the overlay are copied on the screen
+        for widget in self.widgets:
+            screen.blit(self.overlay, widget.pos, widget.get_rect())
@@ -13,3 +13,4 @@ class Item(pygame.sprite.Sprite):
         self.hitbox = self.rect
         self.drawing_order = self.game.layer_drawing_order["main"]
         self.game.all_sprites.add(self)
+        self.game.items.add(self)
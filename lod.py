@@ -0,0 +1,43 @@
+import numpy as np
+
+# enemy tiers, from full fidelity to the cheapest
+NEAR, FAR, DORMANT = 0, 1, 2
+TIER_NAMES = ["near", "far", "dormant"]
+
+
+class LodScheduler:
+    # which enemies get a full update this tick, from their distance to the camera of the last frame:
+    # near = on screen or about to be, every step with collisions and animation
+    # far / dormant = one coarse step every `interval` ticks, with the time they skipped, no animation or mask work
+    def __init__(self, near_margin=128, far_distance=1024, far_interval=2, dormant_interval=4):
+        self.configure(near_margin, far_distance, far_interval, dormant_interval)
+        self.tick = 0
+        self.counts = {name: 0 for name in TIER_NAMES}  # enemies per tier during the last tick, for the debug overlay
+        self.updated = 0  # enemies moved during the last tick
+
+    def configure(self, near_margin=128, far_distance=1024, far_interval=2, dormant_interval=4):
+        # distances in pixels from the camera rect, "enemy_lod" in others/setting.json
+        self.near_margin = near_margin
+        self.far_distance = max(far_distance, near_margin)
+        self.intervals = np.array([1, far_interval, dormant_interval], dtype=np.int64)
+
+    def schedule(self, center_x, center_y, camera_rect, dt):
+        # -> tier of each enemy, and the dt of its step for this tick (0 when it waits for its turn)
+        gap_x = np.maximum(np.maximum(camera_rect.left - center_x, center_x - camera_rect.right), 0)
+        gap_y = np.maximum(np.maximum(camera_rect.top - center_y, center_y - camera_rect.bottom), 0)
+        distance = np.hypot(gap_x, gap_y)
+
+        tiers = np.full(len(distance), DORMANT, dtype=np.int64)
+        tiers[distance <= self.far_distance] = FAR
+        tiers[distance <= self.near_margin] = NEAR
+
+        # slots are staggered so the far ones don't all move on the same tick
+        intervals = self.intervals[tiers]
+        turn = (np.arange(len(tiers)) + self.tick) % intervals == 0
+        step_dt = np.where(turn, dt * intervals, 0.0)
+        self.tick += 1
+
+        counts = np.bincount(tiers, minlength=len(TIER_NAMES))
+        self.counts = dict(zip(TIER_NAMES, counts.tolist()))
+        self.updated = int(np.count_nonzero(turn))
+        return tiers, step_dt
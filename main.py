@@ -1,45 +1,60 @@
+import time
+STARTUP_BEGIN = time.perf_counter()  # before the other imports, they are part of the startup time
+
 import pygame
 import sys
 import os
+import json
 
-from game_management import GameStateManager, ColorManager
+from game_management import GameStateManager, ColorManager, StateRegistry, display, startup_profiler
 from game import Game
 from menu import Start, Pause, Setting, RoundMenu, DeathMenu
 
+# python main.py --profile-startup : prints imports, assets and time to first frame
+startup_profiler.start(STARTUP_BEGIN, "--profile-startup" in sys.argv)
+startup_profiler.mark("imports")
+
 os.environ['SDL_VIDEO_CENTERED'] = '1'
 pygame.init()
 
 clock = pygame.time.Clock()
-FPS = 60
+TICK_RATE = 60  # simulation ticks per second, entities scale by dt so it can be 30 or 144 too
+MAX_FPS = 144  # render cap of the game, 0 = no cap
+MENU_FPS = TICK_RATE  # the menu animations move by a step per frame
+MAX_TICKS_PER_FRAME = 5  # catch-up limit, the rest of the late time is dropped
+TICK_TIME = 1000 / TICK_RATE  # ms
 RESOLUTION = {"720p": [1280, 720],
               "1080p": [1920, 1080]
               }
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 
+with open("others/setting.json", "r") as f:
+    # picks the 720p or 1080p canvas
+    RENDER_RESOLUTION = json.load(f).get("render_resolution", RESOLUTION.get("720p"))
+
 pygame.display.set_caption("Survivor")
-screen = pygame.display.set_mode(RESOLUTION.get("720p"), pygame.RESIZABLE)
+screen = display.set_mode(RENDER_RESOLUTION, RESOLUTION.get("720p"))
+startup_profiler.mark("display")
 
 game_state_manager = GameStateManager("start")
 color_manager = ColorManager(screen)
-game = Game(screen, game_state_manager, color_manager)
-start = Start(screen, game, game_state_manager, color_manager)
-pause = Pause(screen, game, start, game_state_manager, color_manager)
-setting = Setting(screen, game, start, pause, game_state_manager, color_manager)
-round_menu = RoundMenu(screen, game, game_state_manager, color_manager)
-death_menu = DeathMenu(screen, game, game_state_manager, color_manager)
-
-
-states = {
-    "game": game,
-    "start": start,
-    "pause": pause,
-    "setting": setting,
-    "round_menu": round_menu,
-    "death_menu": death_menu
-}
+
+# built on first entry, the game assets are loaded when the first game starts
+states = StateRegistry()
+states.register("game", lambda: Game(screen, game_state_manager, color_manager))
+states.register("start", lambda: Start(screen, states["game"], game_state_manager, color_manager))
+states.register("pause", lambda: Pause(screen, states["game"], states["start"], game_state_manager, color_manager))
+states.register("setting", lambda: Setting(screen, states["game"], states["start"], states["pause"],
+                                           game_state_manager, color_manager))
+states.register("round_menu", lambda: RoundMenu(screen, states["game"], states["start"],
+                                                game_state_manager, color_manager))
+states.register("death_menu", lambda: DeathMenu(screen, states["game"], states["start"],
+                                                game_state_manager, color_manager))
+game = states["game"]
 
 running = True
+accumulator = TICK_TIME  # the first game frame always runs one tick
 
 while running:
 
@@ -48,8 +63,9 @@ while running:
             running = False
 
         if game_state_manager.get_state() == "start":
+            start = states["start"]
             start.mouse_button = pygame.mouse.get_pressed()
-            start.mouse_pos = pygame.mouse.get_pos()
+            start.mouse_pos = display.get_mouse_pos()
             if event.type == pygame.KEYDOWN:
                 start.keys[event.key] = True
             if event.type == pygame.KEYUP:
@@ -58,15 +74,16 @@ while running:
             if not game.pause:
                 if game_state_manager.get_state() == "game":
                     game.mouse_button = pygame.mouse.get_pressed()
-                    game.mouse_pos = pygame.mouse.get_pos()
+                    game.mouse_pos = display.get_mouse_pos()
                     if event.type == pygame.KEYDOWN:
                         game.keys[event.key] = True
                     if event.type == pygame.KEYUP:
                         game.keys[event.key] = False
 
                 elif game_state_manager.get_state() == "setting":
+                    setting = states["setting"]
                     setting.mouse_button = pygame.mouse.get_pressed()
-                    setting.mouse_pos = pygame.mouse.get_pos()
+                    setting.mouse_pos = display.get_mouse_pos()
                     if event.type == pygame.KEYDOWN:
                         setting.keys[event.key] = True
                         setting.event = event
@@ -75,17 +92,36 @@ while running:
 
             else:
                 if game_state_manager.get_state() == "pause":
+                    pause = states["pause"]
                     pause.mouse_button = pygame.mouse.get_pressed()
-                    pause.mouse_pos = pygame.mouse.get_pos()
+                    pause.mouse_pos = display.get_mouse_pos()
                     if event.type == pygame.KEYDOWN:
                         pause.keys[event.key] = True
                     if event.type == pygame.KEYUP:
                         pause.keys[event.key] = False
 
-    states[game_state_manager.get_state()].run()
-
-    pygame.display.update()
-    clock.tick(FPS)
+    if game_state_manager.get_state() == "game":
+        # fixed timestep : the simulation runs at TICK_RATE whatever the render rate is
+        accumulator += clock.get_time()
+        ticks = 0
+        while accumulator >= TICK_TIME and ticks < MAX_TICKS_PER_FRAME:
+            game.update(TICK_TIME / 1000)
+            accumulator -= TICK_TIME
+            ticks += 1
+            if game_state_manager.get_state() != "game":
+                break
+
+        if ticks == MAX_TICKS_PER_FRAME:
+            accumulator = min(accumulator, TICK_TIME)
+
+        game.draw(min(1, accumulator / TICK_TIME))
+    else:
+        accumulator = TICK_TIME
+        states[game_state_manager.get_state()].run()
+
+    display.update()
+    startup_profiler.mark("first frame")
+    clock.tick(MAX_FPS if game_state_manager.get_state() == "game" else MENU_FPS)
 
 pygame.quit()
 sys.exit()
@@ -0,0 +1,205 @@
+import pygame
+import hashlib
+import json
+import os
+import re
+import struct
+
+# tiled stores the flip flags in the 3 highest bits of a gid
+FLIPPED_HORIZONTALLY = 0x80000000
+FLIPPED_VERTICALLY = 0x40000000
+FLIPPED_DIAGONALLY = 0x20000000
+GID_MASK = 0x1FFFFFFF
+
+CACHE_MAGIC = b"MAPC"
+CACHE_VERSION = 1
+HEADER = struct.Struct("<4sH20sI")  # magic, version, sha1 of the map sources, metadata length
+RECT = struct.Struct("<4d")  # x, y, width, height
+
+
+class MapObject:
+    def __init__(self, name, x, y, width, height, properties):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.properties = properties
+
+
+class TileLayer:
+    def __init__(self, name, width, height, data):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.data = data  # flat tuple of tiled gids (flip flags included), row by row
+
+    def iter_data(self):
+        for i, gid in enumerate(self.data):
+            yield i % self.width, i // self.width, gid
+
+
+class MapData:
+    # everything the game reads from the .tmx, without pytmx
+    def __init__(self, directory, width, height, tileset, layers):
+        self.directory = directory
+        self.width = width
+        self.height = height
+        self.tileset = tileset  # image, firstgid, tilewidth, tileheight, columns, margin, spacing
+        self.layers = layers
+        self.tileset_image = None
+        self.images = {}  # tiled gid -> tile surface
+
+    def get_layer_by_name(self, name):
+        return self.layers[name]
+
+    def get_tile_image(self, gid):
+        # same slicing and flip order as pytmx.util_pygame
+        if gid not in self.images:
+            if self.tileset_image is None:
+                self.tileset_image = pygame.image.load(
+                    os.path.join(self.directory, self.tileset["image"])).convert_alpha()
+
+            tile_id = (gid & GID_MASK) - self.tileset["firstgid"]
+            column, row = tile_id % self.tileset["columns"], tile_id // self.tileset["columns"]
+            tile = self.tileset_image.subsurface(pygame.Rect(
+                self.tileset["margin"] + column * (self.tileset["tilewidth"] + self.tileset["spacing"]),
+                self.tileset["margin"] + row * (self.tileset["tileheight"] + self.tileset["spacing"]),
+                self.tileset["tilewidth"], self.tileset["tileheight"]))
+
+            if gid & FLIPPED_DIAGONALLY:
+                tile = pygame.transform.flip(pygame.transform.rotate(tile, 270), True, False)
+            if gid & (FLIPPED_HORIZONTALLY | FLIPPED_VERTICALLY):
+                tile = pygame.transform.flip(tile, bool(gid & FLIPPED_HORIZONTALLY), bool(gid & FLIPPED_VERTICALLY))
+            self.images[gid] = tile
+
+        return self.images[gid]
+
+
+def source_files(tmx_path):
+    # the .tmx and the external .tsx it uses
+    with open(tmx_path, "r", encoding="utf-8") as f:
+        tmx = f.read()
+    directory = os.path.dirname(tmx_path)
+    return [tmx_path] + [os.path.join(directory, source)
+                         for source in re.findall(r'<tileset[^>]*source="([^"]+)"', tmx)]
+
+
+def source_digest(tmx_path):
+    sha1 = hashlib.sha1()
+    for path in source_files(tmx_path):
+        with open(path, "rb") as f:
+            sha1.update(f.read())
+    return sha1.digest()
+
+
+def compile_map(tmx_path):
+    # pytmx is only needed when the cache is missing or stale
+    import pytmx
+
+    tmx_map = pytmx.TiledMap(tmx_path)
+    tileset = tmx_map.tilesets[0]
+
+    # pytmx renumbers the gids, put back the tiled gid with its flip flags
+    tiled_gids = {0: 0}
+    for (tiled_gid, flags), internal in tmx_map.imagemap.items():
+        if tiled_gid:
+            tiled_gids[internal[0]] = (tiled_gid |
+                                       (FLIPPED_HORIZONTALLY if flags.flipped_horizontally else 0) |
+                                       (FLIPPED_VERTICALLY if flags.flipped_vertically else 0) |
+                                       (FLIPPED_DIAGONALLY if flags.flipped_diagonally else 0))
+
+    layers = {}
+    for layer in tmx_map.layers:
+        if isinstance(layer, pytmx.TiledTileLayer):
+            layers[layer.name] = TileLayer(layer.name, layer.width, layer.height,
+                                           tuple(tiled_gids[gid] for row in layer.data for gid in row))
+        elif isinstance(layer, pytmx.TiledObjectGroup):
+            layers[layer.name] = [MapObject(obj.name, obj.x, obj.y, obj.width, obj.height, dict(obj.properties))
+                                  for obj in layer]
+
+    return MapData(os.path.dirname(tmx_path), tmx_map.width, tmx_map.height,
+                   {"image": tileset.source, "firstgid": tileset.firstgid,
+                    "tilewidth": tileset.tilewidth, "tileheight": tileset.tileheight, "columns": tileset.columns,
+                    "margin": tileset.margin, "spacing": tileset.spacing}, layers)
+
+
+def save_cache(map_data, digest, cache_path):
+    # json header for names/properties, then the gid grids (uint32) and object rects (float64) packed
+    metadata = {"width": map_data.width, "height": map_data.height, "tileset": map_data.tileset, "layers": []}
+    body = []
+    for name, layer in map_data.layers.items():
+        if isinstance(layer, TileLayer):
+            metadata["layers"].append({"name": name, "type": "tiles", "width": layer.width, "height": layer.height})
+            body.append(struct.pack(f"<{len(layer.data)}I", *layer.data))
+        else:
+            metadata["layers"].append({"name": name, "type": "objects",
+                                       "objects": [[obj.name, obj.properties] for obj in layer]})
+            body.extend(RECT.pack(obj.x, obj.y, obj.width, obj.height) for obj in layer)
+
+    # written next to the cache then swapped in, an interrupted write never leaves half a cache
+    metadata = json.dumps(metadata).encode("utf-8")
+    temporary_path = cache_path + ".tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(HEADER.pack(CACHE_MAGIC, CACHE_VERSION, digest, len(metadata)))
+        f.write(metadata)
+        f.write(b"".join(body))
+    os.replace(temporary_path, cache_path)
+
+
+def read_cache(tmx_path, digest, cache_path):
+    # None if there is no cache, if it was built from other map sources or if it is damaged
+    try:
+        with open(cache_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    if len(data) < HEADER.size:
+        return None
+    magic, version, cache_digest, metadata_length = HEADER.unpack_from(data)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION or cache_digest != digest:
+        return None
+
+    try:
+        offset = HEADER.size
+        metadata = json.loads(data[offset:offset + metadata_length])
+        offset += metadata_length
+
+        layers = {}
+        for layer in metadata["layers"]:
+            if layer["type"] == "tiles":
+                count = layer["width"] * layer["height"]
+                layers[layer["name"]] = TileLayer(layer["name"], layer["width"], layer["height"],
+                                                  struct.unpack_from(f"<{count}I", data, offset))
+                offset += count * 4
+            else:
+                objects = []
+                for name, properties in layer["objects"]:
+                    objects.append(MapObject(name, *RECT.unpack_from(data, offset), properties))
+                    offset += RECT.size
+                layers[layer["name"]] = objects
+
+        return MapData(os.path.dirname(tmx_path), metadata["width"], metadata["height"], metadata["tileset"],
+                       layers)
+    except (struct.error, ValueError, KeyError):
+        return None  # truncated or corrupt, load_map rebuilds it
+
+
+def load_map(tmx_path, cache_path):
+    # compiled map if it is still fresh, otherwise parse the .tmx once and rewrite the cache
+    digest = source_digest(tmx_path)
+    map_data = read_cache(tmx_path, digest, cache_path)
+    if map_data is None:
+        map_data = compile_map(tmx_path)
+        try:
+            save_cache(map_data, digest, cache_path)
+        except OSError:
+            pass  # read-only install, the map is parsed on every launch
+
+    return map_data
+
+
+if __name__ == "__main__":
+    # rebuild the cache ahead of time : python map_loader.py
+    save_cache(compile_map("assets/map/map.tmx"), source_digest("assets/map/map.tmx"), "others/map.cache")
@@ -3,6 +3,8 @@ import json
 import sys
 import random
 
+from game_management import font_registry, display
+
 
 class Start:
     def __init__(self, screen, game, game_state_manager, color_manager):
@@ -12,7 +14,7 @@ class Start:
         self.game = game
         self.game_state_manager = game_state_manager
         self.color_manager = color_manager
-        self.font = pygame.font.Font("assets/font.ttf", size=40)
+        self.font = font_registry.get_font(40)
         self.save_file = "others/save.json"
         self.import_save()
         self.save_state = False
@@ -215,7 +217,7 @@ class Setting:
         self.game_state_manager = game_state_manager
         self.color_manager = color_manager
 
-        self.font = pygame.font.Font("assets/font.ttf", size=40)
+        self.font = font_registry.get_font(40)
         self.json_file = "others/setting.json"
 
         with open(self.json_file, "r") as f:
@@ -346,13 +348,8 @@ class Setting:
                                 resolution = "1080p"
 
                             if resolution:
-                                x, y = self.configurations[resolution]
-                                self.screen = pygame.display.set_mode((x, y), pygame.RESIZABLE)
-                                self.change_resolution(x, y)
-                                self.game.clearing_sprites_group()
-                                self.game.reset_game_setup()
-                                self.pause.reset_pause_menu()
-                                self.game.load_setup = False
+                                # only the window changes, the game keeps drawing on the same canvas
+                                display.resize_window(self.configurations[resolution])
 
                     elif self.mouse_button[0] and not self.mouse_left_click:
                         self.drawing_text = True
@@ -387,7 +384,7 @@ class Setting:
                                                              self.height // 3 + 325, 255)
                                 self.user_text = ""
 
-                            pygame.display.update()
+                            display.update()
 
             if not self.mouse_button[0]:
                 self.mouse_left_click = False
@@ -398,7 +395,7 @@ class Setting:
     def handle_event_input(self):
         for event in pygame.event.get():
             self.mouse_button = pygame.mouse.get_pressed()
-            self.mouse_pos = pygame.mouse.get_pos()
+            self.mouse_pos = display.get_mouse_pos()
             if event.type == pygame.KEYDOWN:
                 self.keys[event.key] = True
                 self.event = event
@@ -436,18 +433,7 @@ class Setting:
                 self.color_manager.draw_text("Setting Saved", 20, [255, 153, 0], self.width // 2,
                                              self.height // 3 + 325, 255)
 
-            pygame.display.update()
-
-    def change_resolution(self, x, y):
-        state_list = ["game", "start", "pause"]
-        for state in state_list:
-            state_obj = getattr(self, state)
-            state_obj.screen = pygame.display.set_mode((x, y), pygame.RESIZABLE)
-            state_obj.width = state_obj.screen.get_width()
-            state_obj.height = state_obj.screen.get_height()
-
-        self.width = self.screen.get_width()
-        self.height = self.screen.get_height()
+            display.update()
 
     def reset_setting_menu(self):
         self.keys = {}
@@ -469,7 +455,7 @@ class Pause:
         self.game_state_manager = game_state_manager
         self.color_manager = color_manager
 
-        self.font = pygame.font.Font("assets/font.ttf", size=40)
+        self.font = font_registry.get_font(40)
         self.surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
 
         self.text_rects = {}
@@ -574,17 +560,17 @@ class Pause:
 
 
 class RoundMenu:
-    def __init__(self, screen, game, game_state_manager, color_manager):
+    def __init__(self, screen, game, start, game_state_manager, color_manager):
         self.screen = screen
         self.width = screen.get_width()
         self.height = screen.get_height()
         self.game = game
         self.game_state_manager = game_state_manager
         self.color_manager = color_manager
-        self.start = Start(self.screen, self.game, self.game_state_manager, self.color_manager)
+        self.start = start
 
-        self.font = pygame.font.Font("assets/font.ttf", size=30)
-        self.bonus_font = pygame.font.Font("assets/font.ttf", size=20)
+        self.font = font_registry.get_font(30)
+        self.bonus_font = font_registry.get_font(20)
         self.save_file = "others/save.json"
         self.round_menu_surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
         self.rms_width = self.round_menu_surface.get_width()
@@ -734,7 +720,7 @@ class RoundMenu:
 
     def handle_input(self):
         mouse_button = pygame.mouse.get_pressed()
-        mouse_pos = pygame.mouse.get_pos()
+        mouse_pos = display.get_mouse_pos()
 
         for button_name, button_rect in self.texts_rects_for_menu.items():
             if button_name == "Save and Quit":
@@ -767,7 +753,7 @@ class RoundMenu:
             self.mouse_left_click = True
             self.temporary_save()
             self.game.reset_game_init()
-            self.start.reset_start_menu()
+            # the start menu adds/removes "Continue" itself in check_save, from the previous state
             self.game_state_manager.set_state("start")
 
         if (self.texts_rects_for_menu["Continue"].collidepoint(mouse_pos) and mouse_button[0]
@@ -827,19 +813,19 @@ class RoundMenu:
 
 
 class DeathMenu:
-    def __init__(self, screen, game, game_state_manager, color_manager):
+    def __init__(self, screen, game, start, game_state_manager, color_manager):
         self.screen = screen
         self.width = screen.get_width()
         self.height = screen.get_height()
         self.game = game
         self.game_state_manager = game_state_manager
         self.color_manager = color_manager
-        self.start = Start(self.screen, self.game, self.game_state_manager, self.color_manager)
+        self.start = start
 
         self.death_menu_surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
         self.dms_width = self.death_menu_surface.get_width()
         self.dms_height = self.death_menu_surface.get_height()
-        self.font = pygame.font.Font("assets/font.ttf", size=30)
+        self.font = font_registry.get_font(30)
 
         self.default_color = [[255, 153, 102]]
         self.base_color_direction = [[0, 0, 0]]
@@ -918,7 +904,7 @@ class DeathMenu:
 
     def handle_input(self):
         mouse_button = pygame.mouse.get_pressed()
-        mouse_pos = pygame.mouse.get_pos()
+        mouse_pos = display.get_mouse_pos()
 
         for button_name, button_rect in self.return_rect.items():
             button_name = button_name.replace("Return to main menu", "return")
@@ -938,7 +924,7 @@ class DeathMenu:
         if (self.return_rect["Return to main menu"].collidepoint(mouse_pos) and mouse_button[0]
                 and not self.mouse_left_click):
             self.mouse_left_click = True
-            self.start.reset_start_menu()
+            # the start menu adds/removes "Continue" itself in check_save, from the previous state
             self.game.reset_game_init()
             self.game_state_manager.set_state("start")
             self.reset_death_menu()
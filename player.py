@@ -1,9 +1,9 @@
 import pygame
 
 from pygame.math import Vector2 as vector
-from projectile import Bullet
-from sprite import CollidableSprite
-from enemy import Enemy, Item
+from sprite import REFERENCE_FPS
+from projectile import FIRE_BALL, PLAYER
+from asset_manager import assets
 
 
 class Player(pygame.sprite.Sprite):
@@ -11,15 +11,12 @@ class Player(pygame.sprite.Sprite):
         super().__init__(groups)
         self.game = game
 
-        self.sprites = self.import_player_sprite()["player"]
-        self.image = self.sprites[0]
+        self.frames = assets.get_facing_frames("player")
+        self.image, self.mask = self.frames[True][0]
         self.rect = self.image.get_frect(topleft=pos)
         # inflate : divide rect width by 2 and subtract top and bottom by -20
         self.hitbox = self.rect.inflate(-self.rect.width/2, -20)
 
-        self.mask = pygame.mask.from_surface(self.image)
-        self.draw_mask = self.mask.to_surface()
-
         self.drawing_order = self.game.layer_drawing_order["main"]
         self.starting_pos = []
         self.direction = vector()
@@ -31,7 +28,6 @@ class Player(pygame.sprite.Sprite):
         self.facing_right = True
 
         # projectile
-        self.bullets_group = pygame.sprite.Group()
         self.shoot = False
         self.shooting_cooldown = 0
         self.invulnerable_duration = 500  # 0.5sec
@@ -57,29 +53,19 @@ class Player(pygame.sprite.Sprite):
         self.experience = self.save_stats["experience"] if self.save_stats else 0
         self.total_experience = self.save_stats["total_experience"] if self.save_stats else 0
 
-    def update(self):
-        self.draw_mask = self.mask.to_surface()
-
+    def update(self, dt):
         self.input()
-        self.move()
-        self.animate()
+        self.move(dt)
+        self.animate(dt)
 
         if self.shooting_cooldown > 0:
-            self.shooting_cooldown -= 1
-
-        self.check_bullet_collision()
+            self.shooting_cooldown -= dt * REFERENCE_FPS
 
     def input(self):
         try:
             if self.game.mouse_button[0]:
                 self.shoot = True
-
-                if self.game.mouse_pos[0] > self.game.width//2:
-                    right_dir = True
-                else:
-                    right_dir = False
-
-                self.is_shooting(right_dir)
+                self.is_shooting()
             else:
                 self.shoot = False
         except KeyError:
@@ -106,17 +92,17 @@ class Player(pygame.sprite.Sprite):
             input_vector.normalize_ip()
         self.direction = input_vector
 
-    def move(self):
-        self.rect.centerx += self.direction.x * self.speed
+    def move(self, dt):
+        self.rect.centerx += self.direction.x * self.speed * dt * REFERENCE_FPS
         self.hitbox.centerx = self.rect.centerx
         self.check_collision("horizontal")
 
-        self.rect.centery += self.direction.y * self.speed
+        self.rect.centery += self.direction.y * self.speed * dt * REFERENCE_FPS
         self.hitbox.centery = self.rect.centery
         self.check_collision("vertical")
 
     def check_collision(self, axe):
-        for sprite in self.game.collision_sprites:
+        for sprite in self.game.collider_grid.colliders_near(self.hitbox):
             if sprite.hitbox.colliderect(self.hitbox):
                 if axe == "horizontal":
                     if self.direction.x > 0:
@@ -131,36 +117,18 @@ class Player(pygame.sprite.Sprite):
                         self.hitbox.top = sprite.hitbox.bottom
                     self.rect.centery = self.hitbox.centery
 
-        for sprite in self.game.all_sprites:
-            if isinstance(sprite, Item):
-                if sprite.hitbox.colliderect(self.hitbox):
-                    self.health = min(self.base_health, self.health+3)
-                    sprite.kill()
-
-    def check_bullet_collision(self):
-        # only collision_obj (stone and trunk) for bullets
-        for sprite in self.game.collision_sprites.sprites():
-            if isinstance(sprite, CollidableSprite):
-                for bullet in self.bullets_group:
-                    if pygame.sprite.collide_mask(bullet, sprite):
-                        bullet.in_collision = True
-
-        # Collision entre les balles et les ennemis
-        for sprite in self.game.all_sprites.sprites():
-            if isinstance(sprite, Enemy):
-                for bullet in self.bullets_group:
-                    if pygame.sprite.collide_mask(bullet, sprite):
-                        if not bullet.in_collision:
-                            sprite.damage(self.attack)
-                        bullet.in_collision = True
-
-    def is_shooting(self, direction):
-        if self.shooting_cooldown == 0 and self.shoot:
+        for sprite in self.game.items:
+            if sprite.hitbox.colliderect(self.hitbox):
+                self.health = min(self.base_health, self.health+3)
+                sprite.kill()
+
+    def is_shooting(self):
+        if self.shooting_cooldown <= 0 and self.shoot:
             self.shooting_cooldown = int(self.bullet_cd)
-            self.bullet = Bullet(self.hitbox.centerx, self.hitbox.centery+10, self.game.get_mouse_angle(),
-                                 self.game.scaling, self.bullet_spd, self.drawing_order, direction, "fire_ball")
-            self.game.all_sprites.add(self.bullet)
-            self.bullets_group.add(self.bullet)
+            # hits are tested by the projectile manager, 250ms of life per scaling
+            self.game.projectiles.add(FIRE_BALL, PLAYER, self.hitbox.centerx, self.hitbox.centery+10,
+                                      self.game.get_mouse_angle(), self.bullet_spd, 250 * self.game.scaling,
+                                      self.attack)
 
     def level_up(self):
         remain_exp = (self.experience - self.next_level) if self.experience > self.next_level else 0
@@ -183,29 +151,11 @@ class Player(pygame.sprite.Sprite):
                 self.health = 0
             self.last_hit_time = current_time
 
-    def import_player_sprite(self):
-        img_dict = {}
-        width, height = 64, 64
-        nb_of_sprite = 4
-
-        sprite_sheet = pygame.image.load("assets/sprite/player/player_sprite.png").convert_alpha()
-        sprites = []
-
-        for i in range(nb_of_sprite):
-            sprite = sprite_sheet.subsurface(pygame.Rect(i * width, 0, width, height))
-            sprites.append(sprite)
-
-        img_dict["player"] = sprites
-        return img_dict
-
-    def animate(self):
+    def animate(self, dt):
         if self.direction.length() != 0:  # If the player is moving
-            self.animation_index += self.animation_speed
-            if self.animation_index >= len(self.sprites):
+            self.animation_index += self.animation_speed * dt * REFERENCE_FPS
+            if self.animation_index >= len(self.frames[self.facing_right]):
                 self.animation_index = 0
 
-            self.image = self.sprites[int(self.animation_index)]
-            if not self.facing_right:
-                self.image = pygame.transform.flip(self.image, True, False)
-
-        self.mask = pygame.mask.from_surface(self.image)
+            # flipped frames and masks are precomputed by the asset manager
+            self.image, self.mask = self.frames[self.facing_right][int(self.animation_index)]
@@ -1,100 +1,192 @@
 import pygame
 import math
-
-
-class Bullet(pygame.sprite.Sprite):
-    def __init__(self, x, y, angle, scaling, bullet_speed, drawing_order, direction, projectile_type):
-        super().__init__()
-        self.sprites = self.import_projectile_sprite()[projectile_type]
-        self.image = self.sprites["normal"][0]
-        self.rect = self.image.get_frect(center=(x, y))
-        self.mask = pygame.mask.from_surface(self.image)
-        self.draw_mask = self.mask.to_surface()
-
-        self.drawing_order = drawing_order
-        self.x = x
-        self.y = y
-        self.angle = angle
-        self.speed = bullet_speed
-
-        self.x_vel = math.cos(self.angle) * self.speed
-        self.y_vel = math.sin(self.angle) * self.speed
-
-        self.bullet_life_time = 250 * scaling  # ms
-        self.spawn_time = pygame.time.get_ticks()
-
-        # Animation
-        self.animation_index = 0
-        self.in_collision = False
-        self.collision_animation_index = 0
-        self.animation_speed = 0.1
-        self.direction = direction
-
-    def move(self):
-        self.x += self.x_vel
-        self.y += self.y_vel
-
-        self.rect.centerx = int(self.x)
-        self.rect.centery = int(self.y)
-
-        if pygame.time.get_ticks() - self.spawn_time > self.bullet_life_time:
-            self.kill()
-
-    def update(self):
-        self.draw_mask = self.mask.to_surface()
-
-        if not self.in_collision:
-            self.move()
-        self.animate()
-
-    def animate(self):
-        if not self.in_collision:
-            state = "normal"
-            self.animation_index += self.animation_speed
-            if self.animation_index >= len(self.sprites[state]):
-                self.animation_index = 0
-            self.image = self.sprites[state][int(self.animation_index)]
-            index = int(self.animation_index)
-        else:
-            state = "collision"
-            self.collision_animation_index += self.animation_speed
-            if self.collision_animation_index >= len(self.sprites[state]):
-                self.kill()
-                self.collision_animation_index = 0
-            index = int(self.collision_animation_index)
-
-        if not self.direction:
-            self.image = pygame.transform.flip(self.image, True, False)
-
-        self.image = pygame.transform.rotate(self.sprites[state][index], -math.degrees(self.angle))
-        self.rect = self.image.get_frect(center=(self.x, self.y))
-        self.mask = pygame.mask.from_surface(self.image)
-
-    def import_projectile_sprite(self):
-        img_dict = {"spear": {"normal": [], "collision": []},
-                    "fire_ball": {"normal": [], "collision": []}}
-
-        width, height = 64, 64
-        nb_of_normal_sprites = 3
-        nb_of_collision_sprites = 2
-
-        sprite_sheet = pygame.image.load("assets/sprite/projectile/projectile.png").convert_alpha()
-
-        projectiles = ["spear", "fire_ball"]
-
-        for row, projectile in enumerate(projectiles):
-            for col in range(nb_of_normal_sprites):
-                sprite = sprite_sheet.subsurface(pygame.Rect(col * width, row * height, width, height))
-                if projectile == "spear":
-                    sprite = pygame.transform.scale_by(sprite,  1.5)
-                    sprite = pygame.transform.rotate(sprite, 45)
-                img_dict[projectile]["normal"].append(sprite)
-
-            for col in range(nb_of_normal_sprites, nb_of_normal_sprites + nb_of_collision_sprites):
-                sprite = sprite_sheet.subsurface(pygame.Rect(col * width, row * height, width, height))
-                if projectile == "spear":
-                    sprite = pygame.transform.scale_by(sprite, 1.5)
-                    sprite = pygame.transform.rotate(sprite, 45)
-                img_dict[projectile]["collision"].append(sprite)
-
-        return img_dict
+import numpy as np
+
+from asset_manager import assets
+from sprite import REFERENCE_FPS
+from collision import overlapping_boxes, mask_hit
+from struct_arrays import StructOfArrays
+
+# kind -> name in the asset manager, stored in the arrays like the factions and states
+SPEAR, FIRE_BALL = 0, 1
+KIND_NAMES = ["spear", "fire_ball"]
+PLAYER, ENEMY = 0, 1
+FLYING, COLLIDING = 0, 1
+STATE_NAMES = ["normal", "collision"]
+
+ANIMATION_SPEED = 0.1
+
+
+class ProjectileManager(StructOfArrays):
+    # every live projectile of both factions in numpy arrays (one slot each): moved, aged, hit tested
+    # and drawn once per frame for the whole batch
+    def __init__(self, game, capacity=128):
+        fields = dict.fromkeys(["x", "y", "previous_x", "previous_y", "x_velocity", "y_velocity", "angle",
+                                "spawn_time", "life_time", "damage", "animation_index", "width", "height"],
+                               np.float64)
+        fields.update(dict.fromkeys(["kind", "faction", "state"], np.int32))
+        super().__init__(fields, capacity)
+
+        self.game = game
+        self.exhausted = 0  # shots that found every slot taken and grew the arrays
+
+        self.colliders = [np.zeros(0)] * 4  # left, top, right, bottom of the stones and trunks
+        self.collider_sprites = []
+        self.frame_counts = None  # normal and collision frames of each kind, read from the assets when needed
+        self.time = 0  # ms of simulation, stops while the game is paused
+
+    def add(self, kind, faction, x, y, angle, speed, life_time, damage):
+        if self.count == self.capacity:
+            self.exhausted += 1
+        i = self.new_slot()
+
+        # drawn where it is on its first frame, nothing to interpolate from
+        self.x[i] = self.previous_x[i] = x
+        self.y[i] = self.previous_y[i] = y
+        self.x_velocity[i] = math.cos(angle) * speed
+        self.y_velocity[i] = math.sin(angle) * speed
+        self.angle[i] = angle
+        self.spawn_time[i] = self.time
+        self.life_time[i] = life_time
+        self.damage[i] = damage
+        self.animation_index[i] = 0
+        self.kind[i] = kind
+        self.faction[i] = faction
+        self.state[i] = FLYING
+
+        # every frame of a kind has the same size once rotated by the same angle
+        image, mask = assets.get_rotated_projectile(KIND_NAMES[kind], "normal", 0, angle)
+        self.width[i], self.height[i] = image.get_size()
+
+    def remove(self, dead):
+        # the survivors are packed at the start, in the order they were shot
+        keep = np.flatnonzero(~dead)
+        if len(keep) != self.count:
+            self.pack(keep)
+
+    def clear(self):
+        self.count = 0
+
+    def set_colliders(self, collidable_sprites):
+        # static for a whole game, called by Game.setup
+        self.collider_sprites = list(collidable_sprites)
+        self.colliders = [np.array([getattr(sprite.rect, side) for sprite in self.collider_sprites], dtype=np.float64)
+                          for side in ("left", "top", "right", "bottom")]
+
+    def get_frame_counts(self):
+        if self.frame_counts is None:
+            sprites = assets.get_projectile_sprites()
+            self.frame_counts = [np.array([len(sprites[name][state]) for name in KIND_NAMES])
+                                 for state in STATE_NAMES]
+        return self.frame_counts
+
+    def frame(self, i):
+        # rotated image and mask of slot i, from the asset manager cache
+        return assets.get_rotated_projectile(KIND_NAMES[self.kind[i]], STATE_NAMES[self.state[i]],
+                                             int(self.animation_index[i]), self.angle[i])
+
+    def update(self, dt):
+        self.time += dt * 1000
+        n = self.count
+        if not n:
+            return
+
+        self.previous_x[:n] = self.x[:n]
+        self.previous_y[:n] = self.y[:n]
+
+        # flying ones move until their life time is over, the others stay where they hit
+        flying = self.state[:n] == FLYING
+        step = dt * REFERENCE_FPS
+        self.x[:n][flying] += self.x_velocity[:n][flying] * step
+        self.y[:n][flying] += self.y_velocity[:n][flying] * step
+        dead = flying & (self.time - self.spawn_time[:n] > self.life_time[:n])
+
+        # the normal animation loops, the collision one plays once
+        normal_frames, collision_frames = self.get_frame_counts()
+        kind = self.kind[:n]
+        animation_index = self.animation_index[:n]
+        animation_index += ANIMATION_SPEED * step
+        animation_index[flying & (animation_index >= normal_frames[kind])] = 0
+        dead |= ~flying & (animation_index >= collision_frames[kind])
+
+        self.remove(dead)
+        self.check_hits()
+
+    def hits(self, slots, target_boxes, targets):
+        # (slot, target) of the flying projectiles in `slots` whose mask touches the target
+        left = self.x[slots] - self.width[slots] / 2
+        top = self.y[slots] - self.height[slots] / 2
+        first, second = overlapping_boxes((left, top, left + self.width[slots], top + self.height[slots]),
+                                          target_boxes)
+
+        for projectile, target in zip(first.tolist(), second.tolist()):
+            i = slots[projectile]
+            if mask_hit(self.frame(i)[1], left[projectile], top[projectile], targets[target]):
+                yield i, targets[target]
+
+    def collide(self, i):
+        self.state[i] = COLLIDING
+        self.animation_index[i] = 0
+
+    def check_hits(self):
+        n = self.count
+        flying = np.flatnonzero(self.state[:n] == FLYING)
+        if not len(flying):
+            return
+
+        # stones and trunks stop both factions
+        for i, sprite in self.hits(flying, self.colliders, self.collider_sprites):
+            self.collide(i)
+
+        # player projectiles hurt the first enemy they touch
+        engine = self.game.enemy_spawner.engine
+        slots = flying[(self.state[flying] == FLYING) & (self.faction[flying] == PLAYER)]
+        if len(slots) and engine.count:
+            m = engine.count
+            enemies = engine.enemies[:m]
+            for i, enemy in self.hits(slots, (engine.x[:m], engine.y[:m], engine.x[:m] + engine.width[:m],
+                                              engine.y[:m] + engine.height[:m]), enemies):
+                if self.state[i] == FLYING and enemy.index is not None:
+                    self.collide(i)
+                    enemy.damage(self.damage[i])
+
+        # enemy projectiles hurt the player
+        player = self.game.player
+        slots = flying[(self.state[flying] == FLYING) & (self.faction[flying] == ENEMY)]
+        if len(slots):
+            player_box = [np.array([side]) for side in (player.rect.left, player.rect.top,
+                                                        player.rect.right, player.rect.bottom)]
+            for i, target in self.hits(slots, player_box, [player]):
+                self.collide(i)
+                player.damage(self.damage[i])
+
+    def visible_boxes(self, camera_rect, alpha=1):
+        # (slot, left, top) of the projectiles inside the camera, at their position interpolated between the last ticks
+        n = self.count
+        x, y = self.x[:n], self.y[:n]
+        if alpha < 1:
+            x = self.previous_x[:n] + (x - self.previous_x[:n]) * alpha
+            y = self.previous_y[:n] + (y - self.previous_y[:n]) * alpha
+        left = x - self.width[:n] / 2
+        top = y - self.height[:n] / 2
+        visible = np.flatnonzero((left < camera_rect.right) & (left + self.width[:n] > camera_rect.left) &
+                                 (top < camera_rect.bottom) & (top + self.height[:n] > camera_rect.top))
+        return zip(visible.tolist(), left[visible].tolist(), top[visible].tolist())
+
+    def draw(self, screen, offset, camera_rect, alpha=1):
+        # one blits call for every projectile inside the camera
+        if not self.count:
+            return
+
+        screen.blits([(self.frame(i)[0], (left + offset.x, top + offset.y))
+                      for i, left, top in self.visible_boxes(camera_rect, alpha)], doreturn=False)
+
+    def draw_debug(self, screen, offset, camera_rect, alpha=1):
+        # same overlay as the sprites in AllSprite.draw_debug : mask in red, rect in yellow
+        if not self.count:
+            return
+
+        for i, left, top in self.visible_boxes(camera_rect, alpha):
+            image, mask = self.frame(i)
+            screen.blit(mask.to_surface(setcolor=(255, 0, 0, 100), unsetcolor=None), (left + offset.x, top + offset.y))
+            pygame.draw.rect(screen, "yellow", pygame.FRect(left + offset.x, top + offset.y, *image.get_size()), 1)
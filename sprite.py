@@ -1,6 +1,12 @@
 import pygame
+import math
+import bisect
+import heapq
 from pygame.math import Vector2 as vector
 
+# speeds, cooldowns and animation speeds are tuned in frames at this rate, entities scale them by dt
+REFERENCE_FPS = 60
+
 layer_drawing_order = {
             "bg": 0,
             "main": 1,
@@ -10,14 +16,16 @@ layer_drawing_order = {
 
 class Sprite(pygame.sprite.Sprite):
     def __init__(self, pos, surf, groups, drawing_order=layer_drawing_order["main"]):
-        super().__init__(groups)
+        super().__init__()
         self.image = surf
         self.rect = self.image.get_frect(topleft=pos)
         self.hitbox = self.rect.copy()
         self.drawing_order = drawing_order
 
         self.mask = pygame.mask.from_surface(self.image)
-        self.draw_mask = self.mask.to_surface()
+
+        # added after the rect exists so groups indexing by position (AllSprite) can use it
+        self.add(groups)
 
 
 class BorderSprite(Sprite):
@@ -33,11 +41,181 @@ class CollidableSprite(Sprite):
         self.hitbox = self.rect.copy()
 
 
+class ChunkedLayer:
+    # static tiles baked once into big surfaces, only the chunks inside the camera are blitted
+    def __init__(self, map_width, map_height, chunk_size=512):
+        self.chunk_size = chunk_size
+        self.columns = math.ceil(map_width / chunk_size)
+        self.rows = math.ceil(map_height / chunk_size)
+        self.chunks = {}
+
+    def add_tile(self, pos, surf):
+        tile_rect = surf.get_rect(topleft=pos)
+        first_col, last_col = tile_rect.left // self.chunk_size, (tile_rect.right - 1) // self.chunk_size
+        first_row, last_row = tile_rect.top // self.chunk_size, (tile_rect.bottom - 1) // self.chunk_size
+
+        # a tile can overlap up to 4 chunks when the tile size doesn't divide the chunk size (48px tiles)
+        for col in range(first_col, last_col + 1):
+            for row in range(first_row, last_row + 1):
+                if (col, row) not in self.chunks:
+                    self.chunks[(col, row)] = pygame.Surface((self.chunk_size, self.chunk_size),
+                                                             pygame.SRCALPHA).convert_alpha()
+                self.chunks[(col, row)].blit(surf, (tile_rect.x - col * self.chunk_size,
+                                                    tile_rect.y - row * self.chunk_size))
+
+    def draw(self, surface, offset):
+        first_col = max(0, int(-offset.x) // self.chunk_size)
+        first_row = max(0, int(-offset.y) // self.chunk_size)
+        last_col = min(self.columns - 1, int(-offset.x + surface.get_width()) // self.chunk_size)
+        last_row = min(self.rows - 1, int(-offset.y + surface.get_height()) // self.chunk_size)
+
+        for col in range(first_col, last_col + 1):
+            for row in range(first_row, last_row + 1):
+                chunk = self.chunks.get((col, row))
+                if chunk:
+                    surface.blit(chunk, (col * self.chunk_size + offset.x, row * self.chunk_size + offset.y))
+
+
+class SpatialGrid:
+    # uniform grid of buckets, a rect is stored in every cell it overlaps
+    def __init__(self, cell_size=256):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def cells_for(self, rect):
+        first_col, last_col = int(rect.left // self.cell_size), int((rect.right - 1) // self.cell_size)
+        first_row, last_row = int(rect.top // self.cell_size), int((rect.bottom - 1) // self.cell_size)
+        if first_col == last_col and first_row == last_row:
+            return ((first_col, first_row),)  # most entities fit in one cell
+        return [(col, row) for col in range(first_col, last_col + 1) for row in range(first_row, last_row + 1)]
+
+    def insert(self, item, rect):
+        for cell in self.cells_for(rect):
+            self.cells.setdefault(cell, []).append(item)
+
+    def remove(self, item, rect):
+        for cell in self.cells_for(rect):
+            bucket = self.cells.get(cell)
+            if bucket and item in bucket:
+                bucket.remove(item)
+
+    def query(self, rect):
+        # candidates only, the caller still does the exact rect test
+        found = {}
+        for cell in self.cells_for(rect):
+            for item in self.cells.get(cell, ()):
+                found[item] = None
+        return found.keys()
+
+    def clear(self):
+        self.cells.clear()
+
+
+class ColliderGrid(SpatialGrid):
+    # static colliders (borders, stones, trunks) indexed by hitbox, rebuilt by Game.setup
+    def __init__(self, cell_size=256):
+        super().__init__(cell_size)
+        self.order = {}
+
+    def add(self, sprite):
+        self.order[sprite] = len(self.order)
+        self.insert(sprite, sprite.hitbox)
+
+    def colliders_near(self, rect):
+        # colliders sharing a cell with rect, in the order of collision_sprites since the callers move the
+        # hitbox they test while resolving, the exact colliderect stays on their side
+        buckets = [self.cells[cell] for cell in self.cells_for(rect) if cell in self.cells]
+        if len(buckets) == 1:
+            return buckets[0]  # buckets are filled in order already
+        return sorted({sprite: None for bucket in buckets for sprite in bucket}, key=self.order.get)
+
+    def colliders_in(self, cells):
+        # every collider of these (col, row) cells once, in no particular order
+        return {sprite: None for cell in cells for sprite in self.cells.get(cell, ())}.keys()
+
+    def clear(self):
+        super().clear()
+        self.order.clear()
+
+
 class AllSprite(pygame.sprite.Group):
-    def __init__(self):
+    def __init__(self, screen):
         super().__init__()
-        self.screen = pygame.display.get_surface()
+        self.screen = screen
         self.offset = vector()
+        self.bg_layer = None  # ChunkedLayer set by Game.setup
+        self.projectiles = None  # ProjectileManager set by Game, drawn over the main layer
+
+        # map tiles never move: indexed once in a grid, everything else is tested against the camera each frame
+        self.static_grid = SpatialGrid()
+        self.static_order = {}
+        self.dynamic_sprites = {}
+
+        # static "main" tiles sorted once by depth, the few moving sprites are merged into them at draw time
+        self.static_main = []
+        self.static_main_keys = []
+        self.static_main_margin = 0
+        self.static_main_sorted = True
+
+        self.visible_sprites = []  # sprites drawn during the last frame, used by the debug overlay
+        self.camera_rect = pygame.FRect((0, 0), screen.get_size())  # map area drawn during the last frame
+        self.previous_positions = {}  # moving sprites topleft at the start of the last tick
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        if isinstance(sprite, Sprite):
+            self.static_order[sprite] = len(self.static_order)
+            if sprite.drawing_order == layer_drawing_order["main"]:
+                self.static_main.append(sprite)
+                self.static_main_sorted = False
+            else:
+                self.static_grid.insert(sprite, sprite.rect)
+        else:
+            self.dynamic_sprites[sprite] = None
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        if sprite in self.static_order:
+            del self.static_order[sprite]
+            if sprite.drawing_order == layer_drawing_order["main"]:
+                self.static_main.remove(sprite)
+                self.static_main_sorted = False
+            else:
+                self.static_grid.remove(sprite, sprite.rect)
+        else:
+            self.dynamic_sprites.pop(sprite, None)
+
+    def sort_static_main(self):
+        # setup order breaks the ties, like the stable sort did before
+        self.static_main.sort(key=lambda sprite: (sprite.rect.centery, self.static_order[sprite]))
+        self.static_main_keys = [sprite.rect.centery for sprite in self.static_main]
+        self.static_main_margin = max((sprite.rect.height / 2 for sprite in self.static_main), default=0)
+        self.static_main_sorted = True
+
+    def store_previous_positions(self):
+        self.previous_positions = {sprite: sprite.rect.topleft for sprite in self.dynamic_sprites}
+
+    def interpolated_position(self, sprite, alpha):
+        # sprites created during the last tick have no previous position and are drawn where they are
+        previous = self.previous_positions.get(sprite)
+        if previous is None or alpha >= 1:
+            return vector(sprite.rect.topleft)
+        return vector(previous).lerp(sprite.rect.topleft, alpha)
+
+    def interpolated_center(self, sprite, alpha):
+        return self.interpolated_position(sprite, alpha) + (sprite.rect.width / 2, sprite.rect.height / 2)
+
+    def main_sprites(self, camera_rect, dynamic_sprites):
+        if not self.static_main_sorted:
+            self.sort_static_main()
+
+        # only the slice of static tiles whose centery can be inside the camera
+        first = bisect.bisect_left(self.static_main_keys, camera_rect.top - self.static_main_margin)
+        last = bisect.bisect_right(self.static_main_keys, camera_rect.bottom + self.static_main_margin)
+        static_sprites = [sprite for sprite in self.static_main[first:last] if sprite.rect.colliderect(camera_rect)]
+
+        dynamic_sprites = sorted(dynamic_sprites, key=lambda sprite: sprite.rect.centery)
+        return heapq.merge(static_sprites, dynamic_sprites, key=lambda sprite: sprite.rect.centery)
 
     # Basic camera
     # def draw(self, player_center, map_width, map_height):
@@ -49,7 +227,7 @@ class AllSprite(pygame.sprite.Group):
     #         self.screen.blit(sprite.image, sprite.rect.topleft + self.offset)
 
     # Upgraded camera
-    def draw(self, player_center, map_width=int, map_height=int):
+    def draw(self, player_center, map_width=int, map_height=int, alpha=1):
         # Center the camera on the player
         self.offset.x = -(player_center[0] - self.screen.get_width() // 2)
         self.offset.y = -(player_center[1] - self.screen.get_height() // 2)
@@ -58,12 +236,48 @@ class AllSprite(pygame.sprite.Group):
         self.offset.x = min(0, max(self.offset.x, -(map_width - self.screen.get_width())))
         self.offset.y = min(0, max(self.offset.y, -(map_height - self.screen.get_height())))
 
-        bg_sprites = [sprite for sprite in self if sprite.drawing_order < layer_drawing_order["main"]]
-        main_sprites = sorted([sprite for sprite in self if sprite.drawing_order == layer_drawing_order["main"]],
-                              key=lambda sprite: sprite.rect.centery)
-        fg_sprites = [sprite for sprite in self if sprite.drawing_order > layer_drawing_order["main"]]
+        camera_rect = pygame.FRect(-self.offset.x, -self.offset.y, self.screen.get_width(), self.screen.get_height())
+        self.camera_rect = camera_rect
+
+        # keep the setup order of the tiles so overlapping decorations are drawn like before
+        static_sprites = sorted((sprite for sprite in self.static_grid.query(camera_rect)
+                                 if sprite.rect.colliderect(camera_rect)), key=self.static_order.get)
+        dynamic_sprites = [sprite for sprite in self.dynamic_sprites if sprite.rect.colliderect(camera_rect)]
+        visible_sprites = static_sprites + dynamic_sprites
+        self.visible_sprites = visible_sprites
+
+        bg_sprites = [sprite for sprite in visible_sprites if sprite.drawing_order < layer_drawing_order["main"]]
+        main_sprites = self.main_sprites(camera_rect, [sprite for sprite in dynamic_sprites
+                                                       if sprite.drawing_order == layer_drawing_order["main"]])
+        fg_sprites = [sprite for sprite in visible_sprites if sprite.drawing_order > layer_drawing_order["main"]]
+
+        if self.bg_layer:
+            self.bg_layer.draw(self.screen, self.offset)
 
         # tuple with order you need
         for layer in (bg_sprites, main_sprites, fg_sprites):
             for sprite in layer:
-                self.screen.blit(sprite.image, sprite.rect.topleft + self.offset)
+                if sprite in self.dynamic_sprites:
+                    self.screen.blit(sprite.image, self.interpolated_position(sprite, alpha) + self.offset)
+                else:
+                    self.screen.blit(sprite.image, sprite.rect.topleft + self.offset)
+
+            if layer is main_sprites and self.projectiles:
+                self.projectiles.draw(self.screen, self.offset, camera_rect, alpha)
+
+    def draw_debug(self, collision_sprites, alpha=1):
+        # only called when the debug mode is on: masks, hitboxes and colliders drawn over the frame
+        for sprite in self.visible_sprites:
+            if hasattr(sprite, "mask") and not isinstance(sprite, Sprite):
+                mask_surface = sprite.mask.to_surface(setcolor=(255, 0, 0, 100), unsetcolor=None)
+                self.screen.blit(mask_surface, sprite.rect.topleft + self.offset)
+            if hasattr(sprite, "hitbox"):
+                pygame.draw.rect(self.screen, "yellow", sprite.hitbox.move(self.offset), 1)
+
+        for sprite in collision_sprites:
+            color = "cyan" if isinstance(sprite, BorderSprite) else "magenta"
+            pygame.draw.rect(self.screen, color, sprite.hitbox.move(self.offset), 2)
+
+        # projectiles are not sprites, they draw their own masks and boxes
+        if self.projectiles:
+            self.projectiles.draw_debug(self.screen, self.offset, self.camera_rect, alpha)
@@ -0,0 +1,44 @@
+import numpy as np
+
+
+class StructOfArrays:
+    # one numpy array per field (an attribute of the same name) and one slot per entity,
+    # the live entities are the first `count` slots
+    def __init__(self, fields, capacity):
+        self.fields = fields  # name -> dtype
+        self.count = 0
+        self.capacity = 0
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        # new arrays, the live slots are copied over
+        for name, dtype in self.fields.items():
+            array = np.zeros(capacity, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                array[:self.count] = old[:self.count]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def new_slot(self):
+        # index of a free slot at the end, the arrays double when they are full
+        if self.count == self.capacity:
+            self.allocate(self.capacity * 2)
+        self.count += 1
+        return self.count - 1
+
+    def swap_remove(self, i):
+        # the last slot takes the place of slot i
+        last = self.count - 1
+        if i != last:
+            for name in self.fields:
+                array = getattr(self, name)
+                array[i] = array[last]
+        self.count -= 1
+
+    def pack(self, keep):
+        # only the slots in `keep` (sorted) stay, moved to the start in the same order
+        for name in self.fields:
+            array = getattr(self, name)
+            array[:len(keep)] = array[keep]
+        self.count = len(keep)